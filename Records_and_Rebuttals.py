@@ -1,44 +1,28 @@
 import streamlit as st
 import data
+import debug_panel
 import last_fm
+import timing
 
 
+@timing.timed('home.summary_tables')
 def display_summary_tables() -> None:
-    reviews_df = st.session_state["reviews_df"]
+    aggregates = st.session_state["dataset"].aggregates
     st.markdown('#### Album Scores')
     st.dataframe(
-        reviews_df.groupby(["artist", "album"])["score"]
-        .agg(["mean", "median"])
-        .reset_index()
-        .round(2)
-        .sort_values(by='mean', ascending=False)
+        aggregates.albums[["artist", "album", "mean", "median"]]
         .style.background_gradient(axis=None, cmap='RdYlGn'),
         hide_index=True,
     )
 
     st.markdown('#### Favorite Tracks')
-    st.dataframe(
-        reviews_df.groupby(["artist", "album", "favorite_track"])["listener"]
-        .count()
-        .reset_index()
-        .sort_values(by="listener", ascending=False)
-        .rename(columns={"listener": "count"}),
-        hide_index=True,
-    )
+    st.dataframe(aggregates.favorite_tracks, hide_index=True)
 
     st.markdown('#### Least Favorite Tracks')
-    st.dataframe(
-        reviews_df.groupby(["artist", "album", "least_favorite_track"])[
-            "listener"
-        ]
-        .count()
-        .reset_index()
-        .sort_values(by="listener", ascending=False)
-        .rename(columns={"listener": "count"}),
-        hide_index=True,
-    )
+    st.dataframe(aggregates.least_favorite_tracks, hide_index=True)
 
 
+@timing.timed('home.listener_analysis')
 def display_listener_analysis() -> None:
     st.markdown('#### Average Score by Listener/Requester')
     st.dataframe(
@@ -48,50 +32,56 @@ def display_listener_analysis() -> None:
     )
 
     st.markdown('#### Deviation from other listeners\' scores')
+    deviation_df = st.session_state["deviation_df"]
+    overlap_df = st.session_state["overlap_df"]
+    min_overlap = st.number_input(
+        'Minimum albums in common',
+        min_value=1,
+        value=1,
+        help='Hide pairs of listeners who have scored fewer albums in common.',
+    )
+    deviation_df = data.mask_sparse_pairs(deviation_df, overlap_df, min_overlap)
     st.dataframe(
-        st.session_state["deviation_df"]
+        deviation_df
         .style.format(precision=2)
         .background_gradient(axis=None, cmap='RdYlGn_r')
     )
 
 
+@timing.timed('home.top_albums')
 def display_top_albums(lf_client: last_fm.LastFmClient) -> None:
-    reviews_df = st.session_state["reviews_df"]
     st.markdown('#### Top Albums')
-    top_albums = (
-        reviews_df.groupby(["artist", "album"])["score"]
-        .agg(["mean", "median"])
-        .reset_index()
-        .round(2)
-        .sort_values(by="mean", ascending=False)
-        .head(25)
-    )
+    top_albums = st.session_state["dataset"].aggregates.albums.head(25)
     album_list = list(zip(top_albums["artist"], top_albums["album"]))
 
     progress_bar = st.progress(0)
-    album_images = []
-    errors = []
-
-    for index, (artist, album) in enumerate(album_list):
-        try:
-            album_data = lf_client.get_album(artist, album)
-            album_art = album_data.get_album_art()
-            album_images.append((artist, album, album_art))
-        except Exception as e:
-            errors.append((artist, album, str(e)))
-        finally:
-            progress_bar.progress((index + 1) / len(album_list))
+    results = []
+    fetches = lf_client.fetch_albums(
+        album_list, art_width=last_fm.GRID_ART_WIDTH
+    )
+    for done, result in enumerate(fetches, start=1):
+        results.append(result)
+        progress_bar.progress(done / len(album_list))
 
     progress_bar.empty()
 
+    results.sort(key=lambda result: result.index)
+    errors = [
+        (r.artist, r.album, str(r.error)) for r in results if r.error is not None
+    ]
+
+    # Albums without art keep their place in the grid as a caption.
     columns = [st.columns(5) for _ in range(5)]
-    for index, (artist, album, album_art) in enumerate(album_images):
+    for index, result in enumerate(results):
         row, col = divmod(index, 5)
         with columns[row][col]:
-            st.image(album_art, use_container_width=True)
-            st.caption(f"{artist} - {album}")
+            if result.error is None:
+                st.image(result.album_art, use_container_width=True)
+            st.caption(f"{result.artist} - {result.album}")
 
-    if errors:
+    if errors and last_fm.health()['circuit'] != 'closed':
+        st.caption("Last.fm is unreachable right now, so album art is skipped.")
+    elif errors:
         st.markdown("### Errors")
         for artist, album, error_message in errors:
             st.error(
@@ -101,8 +91,9 @@ def display_top_albums(lf_client: last_fm.LastFmClient) -> None:
 
 st.set_page_config(page_title='Records and Rebuttals')
 data.ensure_session_state(st.secrets['SHEETS_DOC_ID'])
-lf_client = last_fm.LastFmClient(st.secrets['LAST_FM_API_KEY'])
+lf_client = last_fm.get_client(st.secrets['LAST_FM_API_KEY'])
 
 display_summary_tables()
 display_listener_analysis()
 display_top_albums(lf_client)
+debug_panel.render()
@@ -0,0 +1,142 @@
+"""Time and peak memory of each data-pipeline builder across sheet sizes.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_pipeline
+    python -m benchmarks.bench_pipeline --scales 1 10 100 --json results.json
+
+Each scale multiplies the album count of today's sheet; ``--listeners``
+sets the listener count. Timings are the median of ``--repeat`` runs; peak
+memory is what ``tracemalloc`` sees during a separate run of the builder
+(NumPy and pandas buffers included), measured above whatever was already
+allocated.
+"""
+import argparse
+import json
+import logging
+import statistics
+import time
+import tracemalloc
+from typing import Any, Callable
+
+import pandas as pd
+
+import data
+from benchmarks.synthetic_sheet import BASE_ALBUMS, BASE_LISTENERS, make_sheet_csv
+
+# (name, builder). Each builder takes the frames built so far and returns
+# its own output, which later builders can read back under the same name.
+STAGES: list[tuple[str, Callable[[dict[str, Any]], Any]]] = [
+    ('parse_sheet', lambda f: data.parse_sheet(f['csv'])),
+    ('get_listeners', lambda f: data.get_listeners(f['parse_sheet'])),
+    ('build_albums_df', lambda f: data.build_albums_df(f['parse_sheet'])),
+    (
+        'build_reviews_df',
+        lambda f: data.build_reviews_df(f['parse_sheet'], f['get_listeners']),
+    ),
+    (
+        'build_deviation_frames',
+        lambda f: data.build_deviation_frames(f['build_reviews_df']),
+    ),
+    (
+        'build_listener_requester_df',
+        lambda f: data.build_listener_requester_df(
+            f['build_reviews_df'], f['build_albums_df']
+        ),
+    ),
+    (
+        'build_album_stats_df',
+        lambda f: data.build_album_stats_df(
+            f['build_reviews_df'], f['build_albums_df']
+        ),
+    ),
+    (
+        'build_aggregates',
+        lambda f: data.build_aggregates(
+            f['build_reviews_df'],
+            f['build_albums_df'],
+            f['build_album_stats_df'],
+        ),
+    ),
+]
+
+
+def _time(builder, frames, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = builder(frames)
+        timings.append(time.perf_counter() - start)
+    return result, statistics.median(timings)
+
+
+def _peak_memory(builder, frames):
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        builder(frames)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak - baseline
+
+
+def run(n_listeners: int, n_albums: int, repeat: int = 3, seed: int = 0):
+    """Benchmark every stage on one synthetic sheet; one dict per stage."""
+    frames = {'csv': make_sheet_csv(n_listeners, n_albums, seed=seed)}
+    rows = []
+    for name, builder in STAGES:
+        frames[name], seconds = _time(builder, frames, repeat)
+        rows.append(
+            {
+                'listeners': n_listeners,
+                'albums': n_albums,
+                'stage': name,
+                'seconds': seconds,
+                'peak_bytes': _peak_memory(builder, frames),
+            }
+        )
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument(
+        '--scales',
+        type=float,
+        nargs='+',
+        default=[1, 10, 100],
+        help='multiples of today\'s album count (default: 1 10 100)',
+    )
+    parser.add_argument('--listeners', type=int, default=BASE_LISTENERS)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args(argv)
+
+    # build_frames' memory report and Streamlit's no-runtime warnings would
+    # drown out the table.
+    logging.disable(logging.WARNING)
+    rows = []
+    for scale in args.scales:
+        n_albums = max(1, round(BASE_ALBUMS * scale))
+        rows.extend(run(args.listeners, n_albums, args.repeat, args.seed))
+
+    results = pd.DataFrame(rows)
+    table = results.assign(
+        ms=(results['seconds'] * 1000).round(1),
+        peak_mib=(results['peak_bytes'] / 2**20).round(2),
+    )
+    print(
+        table.pivot(index='stage', columns='albums', values=['ms', 'peak_mib'])
+        .reindex([name for name, _ in STAGES])
+        .to_string()
+    )
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
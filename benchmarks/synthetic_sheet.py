@@ -0,0 +1,75 @@
+"""Synthetic sheets shaped like the Google Sheets export.
+
+``make_sheet`` returns the same layout ``data.load_sheet`` reads from the
+real sheet: an unnamed whitespace date column, the album metadata columns,
+a ``Name`` / ``Name.1`` / ``Name.2`` triplet per listener (score, favorite
+track, least favorite track) and a trailing ``Average``.
+"""
+import numpy as np
+import pandas as pd
+
+# Roughly the size of the club's sheet today.
+BASE_LISTENERS = 12
+BASE_ALBUMS = 150
+
+
+def make_sheet(
+    n_listeners: int = BASE_LISTENERS,
+    n_albums: int = BASE_ALBUMS,
+    review_rate: float = 0.85,
+    seed: int = 0,
+) -> pd.DataFrame:
+    """Build a raw (un-normalized) sheet with the given dimensions.
+
+    Each listener reviews about ``review_rate`` of the albums, with later
+    listeners joining partway through like real members do. The output is
+    deterministic for a given ``seed``.
+    """
+    rng = np.random.default_rng(seed)
+    listeners = [f'Listener {i}' for i in range(n_listeners)]
+    years = rng.integers(1955, 2025, size=n_albums)
+    dates = pd.date_range('2000-01-01', periods=n_albums, freq='D')
+    # About three albums per artist, so artist names repeat like they do.
+    artists = rng.integers(0, max(1, n_albums // 3), size=n_albums)
+    columns = {
+        ' ': dates.strftime('%Y-%m-%d'),
+        'Requester': rng.choice(listeners, size=n_albums),
+        'Artist': [f'Artist {a}' for a in artists],
+        'Album': [f'Album {i}' for i in range(n_albums)],
+        'Release Year': years,
+        'Decade': [f'{(y // 10) * 10}s' for y in years],
+    }
+
+    scores = np.round(rng.normal(6.5, 1.8, size=(n_albums, n_listeners)) * 2) / 2
+    scores = np.clip(scores, 0, 10)
+    joined = rng.integers(0, max(1, n_albums // 4), size=n_listeners)
+    joined[: max(1, n_listeners // 2)] = 0
+    reviewed = (rng.random((n_albums, n_listeners)) < review_rate) & (
+        np.arange(n_albums)[:, None] >= joined[None, :]
+    )
+    scores = np.where(reviewed, scores, np.nan)
+    track_numbers = rng.integers(1, 13, size=(n_albums, n_listeners, 2))
+    has_least = reviewed & (rng.random((n_albums, n_listeners)) < 0.4)
+    for j, name in enumerate(listeners):
+        columns[name] = scores[:, j]
+        columns[f'{name}.1'] = np.where(
+            reviewed[:, j],
+            [f'Track {n}' for n in track_numbers[:, j, 0]],
+            None,
+        )
+        columns[f'{name}.2'] = np.where(
+            has_least[:, j],
+            [f'Track {n}' for n in track_numbers[:, j, 1]],
+            None,
+        )
+    with np.errstate(invalid='ignore'):
+        counts = reviewed.sum(axis=1)
+        columns['Average'] = np.round(
+            np.where(counts > 0, np.nansum(scores, axis=1) / counts, np.nan), 2
+        )
+    return pd.DataFrame(columns)
+
+
+def make_sheet_csv(*args, **kwargs) -> bytes:
+    """``make_sheet`` serialized the way the sheet's CSV export looks."""
+    return make_sheet(*args, **kwargs).to_csv(index=False).encode('utf-8')
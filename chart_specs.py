@@ -0,0 +1,177 @@
+"""Vega-Lite specs for the Stats page charts.
+
+Specs are built once per dataset version (``data.Dataset.chart_specs``) and
+passed to ``st.vega_lite_chart`` as they are, so reruns skip Altair's dict
+conversion and jsonschema validation. Chart data is embedded under
+``datasets`` as Arrow IPC bytes, the same form ``st.altair_chart`` produces,
+so it isn't re-serialized on every render either.
+"""
+import hashlib
+import threading
+
+import altair as alt
+import pandas as pd
+import pyarrow as pa
+
+import timing
+
+# Altair's theme and data-transformer switches are process-wide.
+_convert_lock = threading.Lock()
+
+
+def _arrow_bytes(df: pd.DataFrame) -> bytes:
+    table = pa.Table.from_pandas(df)
+    sink = pa.BufferOutputStream()
+    with pa.RecordBatchStreamWriter(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def to_spec(chart: alt.TopLevelMixin, validate: bool = False) -> dict:
+    """Convert ``chart`` to a Vega-Lite dict ready for ``st.vega_lite_chart``.
+
+    Data goes into named Arrow datasets and the default Altair theme is
+    switched off, as ``st.altair_chart`` does, so the result renders the
+    same as passing the chart to Streamlit directly.
+    """
+    datasets = {}
+
+    def to_arrow(data):
+        content = _arrow_bytes(data)
+        name = hashlib.md5(content).hexdigest()
+        datasets[name] = content
+        return {'name': name}
+
+    with _convert_lock:
+        alt.data_transformers.register('record_club_arrow', to_arrow)
+        with alt.theme.enable('none'), alt.data_transformers.enable(
+            'record_club_arrow'
+        ):
+            spec = chart.to_dict(validate=validate)
+    spec['datasets'] = datasets
+    return spec
+
+
+def stats_charts(chart_data, decades: pd.DataFrame) -> dict[str, alt.TopLevelMixin]:
+    """The Stats page's Altair charts, keyed by name.
+
+    Charts whose data is empty are left out.
+    """
+    charts = {}
+    charts['score_histogram'] = (
+        alt.Chart(chart_data.score_histogram)
+        .mark_bar(color='#e45756')
+        .encode(
+            x=alt.X('bin_start:Q', bin='binned', title='Score'),
+            x2='bin_end:Q',
+            y=alt.Y('reviews:Q', title='Reviews'),
+            tooltip=[alt.Tooltip('reviews:Q', title='Reviews')],
+        )
+        .properties(height=260)
+    )
+    charts['listener_histogram'] = (
+        alt.Chart(chart_data.listener_histogram)
+        .mark_rect()
+        .encode(
+            x=alt.X('bin_start:Q', bin='binned', title='Score'),
+            x2='bin_end:Q',
+            y=alt.Y('listener:N', title=None),
+            color=alt.Color(
+                'reviews:Q', scale=alt.Scale(scheme='reds'), title='Reviews'
+            ),
+            tooltip=['listener', 'bin_start', 'reviews'],
+        )
+        .properties(height=260)
+    )
+
+    if not decades.empty:
+        order = list(decades['decade'])
+        score_min = decades['avg_score'].min() - 5
+        score_max = decades['avg_score'].max() + 5
+        charts['decade_albums'] = (
+            alt.Chart(decades)
+            .mark_bar(color='#4c78a8')
+            .encode(
+                x=alt.X('decade:N', sort=order, title=None),
+                y=alt.Y('albums:Q', title='Albums'),
+                tooltip=['decade', 'albums'],
+            )
+            .properties(height=260)
+        )
+        charts['decade_scores'] = (
+            alt.Chart(decades)
+            .mark_bar(color='#54a24b')
+            .encode(
+                x=alt.X('decade:N', sort=order, title=None),
+                y=alt.Y(
+                    'avg_score:Q',
+                    title='Avg score',
+                    scale=alt.Scale(domain=[score_min, score_max]),
+                ),
+                tooltip=['decade', 'avg_score'],
+            )
+            .properties(height=260)
+        )
+
+    if not chart_data.release_years.empty:
+        points = (
+            alt.Chart(chart_data.release_years)
+            .mark_circle(size=90, opacity=0.75)
+            .encode(
+                x=alt.X(
+                    'release_year:Q',
+                    title='Release year',
+                    scale=alt.Scale(zero=False),
+                ),
+                y=alt.Y(
+                    'mean:Q',
+                    title='Average score',
+                    scale=alt.Scale(zero=False),
+                ),
+                color=alt.Color(
+                    'mean:Q', scale=alt.Scale(scheme='redyellowgreen')
+                ),
+                tooltip=['artist', 'album', 'release_year', 'mean'],
+            )
+        )
+        trend = (
+            alt.Chart(chart_data.release_year_trend)
+            .mark_line(color='#e45756', strokeWidth=3)
+            .encode(x='release_year:Q', y='mean:Q')
+        )
+        charts['release_years'] = (points + trend).properties(height=340)
+
+    if not chart_data.timeline.empty:
+        line = (
+            alt.Chart(chart_data.timeline)
+            .mark_line(color='#4c78a8', strokeWidth=2)
+            .encode(
+                x=alt.X('date:T', title=None),
+                y=alt.Y('cumulative:Q', title='Albums reviewed'),
+            )
+        )
+        dots = (
+            alt.Chart(chart_data.timeline)
+            .mark_circle(size=80)
+            .encode(
+                x='date:T',
+                y='cumulative:Q',
+                color=alt.Color(
+                    'mean:Q',
+                    scale=alt.Scale(scheme='redyellowgreen'),
+                    title='Score',
+                ),
+                tooltip=['date:T', 'artist', 'album', 'mean'],
+            )
+        )
+        charts['timeline'] = (line + dots).properties(height=320)
+    return charts
+
+
+@timing.timed('charts.specs')
+def build_stats_specs(chart_data, decades: pd.DataFrame) -> dict[str, dict]:
+    """``stats_charts`` converted to Vega-Lite dicts, without validation."""
+    return {
+        name: to_spec(chart)
+        for name, chart in stats_charts(chart_data, decades).items()
+    }
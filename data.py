@@ -1,15 +1,241 @@
+import csv
+import functools
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from io import BytesIO, TextIOWrapper
+from typing import NamedTuple
+
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import requests
+from pyarrow import csv as pa_csv
 import streamlit as st
 
+import chart_specs
+import timing
 
-@st.cache_data
-def load_sheet(sheets_doc_id: str) -> pd.DataFrame:
-    df = pd.read_csv(
-        f'https://docs.google.com/spreadsheets/d/{sheets_doc_id}/export?format=csv&sheet=Albums',
-        encoding='utf_8',
+logger = logging.getLogger(__name__)
+
+_SHEET_URL = (
+    'https://docs.google.com/spreadsheets/d/{doc_id}/export?format=csv&sheet=Albums'
+)
+_SHEET_TIMEOUT = (3.05, 30)
+# How long a downloaded copy of the sheet is trusted before asking Google
+# again. Re-checks are conditional, so an unchanged sheet is cheap.
+_SHEET_TTL_SECONDS = 5 * 60
+# How often the background refresher re-checks the sheet. Set
+# RECORD_CLUB_REFRESH_SECONDS=0 to turn it off and check on each rerun
+# instead.
+_REFRESH_SECONDS = _SHEET_TTL_SECONDS
+_DEFAULT_CACHE_DIR = '.cache'
+# Bump whenever a builder changes the shape or dtypes of its frame, so
+# snapshots written by older code are ignored rather than misread.
+_SNAPSHOT_SCHEMA = 4
+# Scores are whole or half points out of 10, which float32 holds exactly.
+_SCORE_DTYPE = 'float32'
+
+FRAME_NAMES = (
+    'albums_df',
+    'reviews_df',
+    'deviation_df',
+    'overlap_df',
+    'listener_requester_df',
+    'album_stats_df',
+)
+
+
+class SheetDownload(NamedTuple):
+    content: bytes
+    fingerprint: str
+    etag: str | None = None
+    last_modified: str | None = None
+
+
+_last_downloads: dict[str, SheetDownload] = {}
+_last_downloads_lock = threading.Lock()
+
+
+def download_sheet(sheets_doc_id: str) -> SheetDownload:
+    """Download the sheet's CSV export and fingerprint its contents.
+
+    When a previous download carried ``ETag``/``Last-Modified`` validators
+    the request is made conditional, and a 304 reuses the previous bytes.
+    """
+    with _last_downloads_lock:
+        previous = _last_downloads.get(sheets_doc_id)
+    headers = {}
+    if previous is not None:
+        if previous.etag:
+            headers['If-None-Match'] = previous.etag
+        if previous.last_modified:
+            headers['If-Modified-Since'] = previous.last_modified
+    response = requests.get(
+        _SHEET_URL.format(doc_id=sheets_doc_id),
+        headers=headers,
+        timeout=_SHEET_TIMEOUT,
+    )
+    if response.status_code == 304 and previous is not None:
+        return previous
+    response.raise_for_status()
+    download = SheetDownload(
+        content=response.content,
+        fingerprint=hashlib.sha256(response.content).hexdigest(),
+        etag=response.headers.get('ETag'),
+        last_modified=response.headers.get('Last-Modified'),
+    )
+    with _last_downloads_lock:
+        _last_downloads[sheets_doc_id] = download
+    return download
+
+
+@st.cache_data(ttl=_SHEET_TTL_SECONDS, show_spinner=False)
+def fetch_sheet(sheets_doc_id: str) -> SheetDownload:
+    return download_sheet(sheets_doc_id)
+
+
+_METADATA_COLUMNS = (
+    'Date',
+    'Requester',
+    'Artist',
+    'Album',
+    'Release Year',
+    'Decade',
+)
+
+
+def _mangle_header(names: list[str]) -> list[str]:
+    """Header names as ``pd.read_csv`` would give them: blank names become
+    ``Unnamed: <i>`` and repeats get ``.1``, ``.2``, ... suffixes."""
+    seen = set()
+    mangled = []
+    for i, name in enumerate(names):
+        base = name if name != '' else f'Unnamed: {i}'
+        name, n = base, 0
+        while name in seen:
+            n += 1
+            name = f'{base}.{n}'
+        seen.add(name)
+        mangled.append(name)
+    return mangled
+
+
+def _sheet_columns(columns: list[str]) -> tuple[list[str], list[str]]:
+    """The (normalized) columns the builders read, and which of those hold
+    numbers. Without an ``Average`` column the layout is unknown, so every
+    column is kept."""
+    if 'Average' not in columns:
+        numeric = [c for c in ('Release Year',) if c in columns]
+        return list(columns), numeric
+    listeners = _listener_columns(columns)
+    wanted = {*_METADATA_COLUMNS, 'Average'}
+    for name in listeners:
+        wanted.update((name, f'{name}.1', f'{name}.2'))
+    keep = [c for c in columns if c in wanted]
+    numeric = [c for c in ('Release Year', 'Average', *listeners) if c in keep]
+    return keep, numeric
+
+
+def _cast_numeric(column: pa.ChunkedArray) -> pa.ChunkedArray:
+    """Whole numbers as int64, else float64; unchanged (still strings) if
+    any value isn't a plain number, for ``pd.to_numeric`` to sort out."""
+    for numeric_type in (pa.int64(), pa.float64()):
+        try:
+            return column.cast(numeric_type)
+        except pa.ArrowInvalid:
+            pass
+    return column
+
+
+def _read_csv_arrow(content: bytes, typed: bool) -> pd.DataFrame:
+    """Read only the needed columns with pyarrow, inferring no types.
+
+    With ``typed``, score and ``Average`` columns are parsed as float64
+    while reading and any stray text in them makes pyarrow raise. Without
+    it, they are read as strings and cast column by column afterwards, so
+    only the dirty ones are left for ``pd.to_numeric``. Everything else is
+    read as strings.
+
+    pyarrow keeps duplicate and blank header names as they are, so the
+    header is read and mangled here to match what the rest of the code
+    expects from ``pd.read_csv``.
+    """
+    header = next(csv.reader(TextIOWrapper(BytesIO(content), 'utf-8-sig')))
+    names = _mangle_header(header)
+    normalized = list(_normalize_columns(pd.DataFrame(columns=names)).columns)
+    keep, numeric = _sheet_columns(normalized)
+    include = [raw for raw, col in zip(names, normalized) if col in keep]
+    column_types = {name: pa.string() for name in include}
+    if typed:
+        for raw, col in zip(names, normalized):
+            # Release years keep int64 when they're all whole, as pandas
+            # would infer, so they're cast below instead.
+            if col in numeric and col != 'Release Year':
+                column_types[raw] = pa.float64()
+    table = pa_csv.read_csv(
+        BytesIO(content),
+        read_options=pa_csv.ReadOptions(column_names=names, skip_rows=1),
+        convert_options=pa_csv.ConvertOptions(
+            column_types=column_types,
+            include_columns=include,
+            strings_can_be_null=True,
+        ),
     )
-    return _normalize_columns(df)
+    for raw, col in zip(names, normalized):
+        i = table.schema.get_field_index(raw)
+        if col in numeric and pa.types.is_string(table.schema.field(i).type):
+            table = table.set_column(i, raw, _cast_numeric(table.column(i)))
+    return table.to_pandas()
+
+
+def _read_sheet_csv(content: bytes) -> pd.DataFrame:
+    for typed in (True, False):
+        try:
+            return _read_csv_arrow(content, typed)
+        except pa.ArrowInvalid:
+            # Typed, this is stray text in a number column: retry reading
+            # those as strings. Untyped, pyarrow can't read the file.
+            continue
+        except (csv.Error, UnicodeDecodeError, StopIteration):
+            break
+    # Ragged rows and other oddities pyarrow rejects but pandas' own parser
+    # tolerates.
+    return pd.read_csv(BytesIO(content), encoding='utf_8')
+
+
+def parse_sheet(content: bytes) -> pd.DataFrame:
+    """Parse the sheet's CSV export into the columns the builders use.
+
+    Score, ``Release Year`` and ``Average`` columns are always numeric:
+    stray text in them (``TBD``, ``n/a``) becomes NaN rather than turning
+    the whole column into strings. Unused columns are dropped.
+    """
+    df = _normalize_columns(_read_sheet_csv(content))
+    keep, numeric = _sheet_columns(list(df.columns))
+    if keep != list(df.columns):
+        df = df[keep]
+    dirty = [c for c in numeric if not pd.api.types.is_numeric_dtype(df[c])]
+    if dirty:
+        df[dirty] = df[dirty].apply(pd.to_numeric, errors='coerce')
+    return df
+
+
+# The fingerprint identifies the content, so the bytes themselves (leading
+# underscore) don't need hashing again.
+@st.cache_data(max_entries=2, show_spinner=False)
+def _parse_sheet_cached(fingerprint: str, _content: bytes) -> pd.DataFrame:
+    return parse_sheet(_content)
+
+
+def load_sheet(sheets_doc_id: str) -> pd.DataFrame:
+    sheet = fetch_sheet(sheets_doc_id)
+    return _parse_sheet_cached(sheet.fingerprint, sheet.content)
 
 
 def _normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
@@ -26,12 +252,18 @@ def _normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
 
 def get_listeners(df: pd.DataFrame) -> list[str]:
     """Detect listener columns positionally: everything between 'Release Year' (or 'Album') and 'Average'."""
-    cols = list(df.columns)
+    return _listener_columns(list(df.columns))
+
+
+def _listener_columns(cols: list[str]) -> list[str]:
     avg_idx = cols.index('Average')
     # Find the last metadata column before Average
-    metadata = ['Date', 'Requester', 'Artist', 'Album', 'Release Year', 'Decade']
     last_meta_idx = max(
-        (cols.index(c) for c in metadata if c in cols and cols.index(c) < avg_idx),
+        (
+            cols.index(c)
+            for c in _METADATA_COLUMNS
+            if c in cols and cols.index(c) < avg_idx
+        ),
         default=0,
     )
     return [
@@ -40,15 +272,80 @@ def get_listeners(df: pd.DataFrame) -> list[str]:
     ]
 
 
-def _year_to_decade(year) -> str | None:
+def _year_to_decade(years: pd.Series) -> pd.Series:
+    """'1960s'-style labels for a column of years; NaN where not a year."""
+    years = pd.to_numeric(years, errors='coerce')
+    decades = (years // 10 * 10).astype('Int64').astype(str) + 's'
+    return decades.where(years.notna())
+
+
+def _category_dtype(*values) -> pd.CategoricalDtype:
+    """Categories for the distinct non-null values, in first-seen order.
+
+    Builders derive their categories from the same sheet columns, so frames
+    built from one sheet share identical dtypes and merge, compare and group
+    on integer codes instead of strings.
+    """
+    seen = pd.unique(
+        np.concatenate([np.asarray(v, dtype=object) for v in values])
+    )
+    return pd.CategoricalDtype(pd.Index(seen).dropna())
+
+
+def _people_dtype(df: pd.DataFrame, listeners=()) -> pd.CategoricalDtype:
+    """One category set for everyone who listens or requests."""
     try:
-        y = int(year)
-    except (TypeError, ValueError):
-        return None
-    return f"{(y // 10) * 10}s"
+        sheet_listeners = get_listeners(df)
+    except ValueError:
+        sheet_listeners = []
+    requesters = df['Requester'] if 'Requester' in df.columns else []
+    return _category_dtype(sheet_listeners, listeners, requesters)
+
+
+def _album_ids(df: pd.DataFrame) -> np.ndarray:
+    """Integer id per distinct (artist, album) pair in the sheet.
+
+    Ids are assigned in first-seen sheet order, so appending rows never
+    renumbers existing albums. Rows missing an artist or album get -1.
+    """
+    valid = (df['Artist'].notna() & df['Album'].notna()).to_numpy()
+    keys = pd.MultiIndex.from_arrays(
+        [df['Artist'][valid].astype(str), df['Album'][valid].astype(str)]
+    )
+    ids = np.full(len(df), -1, dtype=np.int32)
+    ids[valid] = keys.factorize()[0]
+    return ids
+
+
+def frame_memory(df: pd.DataFrame) -> int:
+    """Bytes used by ``df``, including the Python strings it points at."""
+    return int(df.memory_usage(deep=True).sum())
+
+
+def memory_report(frames: dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """Memory per frame as built, next to the same data as plain
+    object-string / float64 columns (how the builders used to store it)."""
+    rows = []
+    for name, df in frames.items():
+        expanded = df.astype(
+            {
+                col: object if isinstance(dtype, pd.CategoricalDtype) else float
+                for col, dtype in df.dtypes.items()
+                if isinstance(dtype, pd.CategoricalDtype) or dtype == np.float32
+            }
+        )
+        rows.append(
+            {
+                'frame': name,
+                'before_bytes': frame_memory(expanded),
+                'after_bytes': frame_memory(df),
+            }
+        )
+    return pd.DataFrame(rows)
 
 
 def build_albums_df(df: pd.DataFrame) -> pd.DataFrame:
+    """One row per sheet row: ``album_id`` plus the album's metadata."""
     columns = {
         'Artist': 'artist',
         'Album': 'album',
@@ -64,125 +361,1055 @@ def build_albums_df(df: pd.DataFrame) -> pd.DataFrame:
         df[list(available.keys())].rename(columns=available).reset_index(drop=True)
     )
     if 'decade' not in result.columns and 'release_year' in result.columns:
-        result['decade'] = result['release_year'].apply(_year_to_decade)
+        result['decade'] = _year_to_decade(result['release_year'])
     if 'date' in result.columns:
         result['date'] = pd.to_datetime(result['date'], errors='coerce')
+    categorical = {
+        'artist': _category_dtype(df['Artist']),
+        'album': _category_dtype(df['Album']),
+        'requester': _people_dtype(df),
+    }
+    result = result.astype(
+        {k: v for k, v in categorical.items() if k in result.columns}
+    )
+    result.insert(0, 'album_id', _album_ids(df))
     return result
 
 
+def build_album_lookup(albums_df: pd.DataFrame) -> pd.DataFrame:
+    """Album metadata indexed by ``album_id``, one row per album."""
+    known = albums_df[albums_df['album_id'] >= 0]
+    return known.drop_duplicates('album_id').set_index('album_id')
+
+
+def build_listener_lookup(reviews_df: pd.DataFrame) -> pd.Series:
+    """Listener names indexed by ``listener_id``."""
+    return (
+        reviews_df[['listener_id', 'listener']]
+        .drop_duplicates('listener_id')
+        .set_index('listener_id')['listener']
+        .sort_index()
+    )
+
+
+def _scores64(reviews_df: pd.DataFrame) -> pd.Series:
+    """Review scores as float64 for aggregating.
+
+    Scores are stored as float32, but means and spreads summed in float32
+    can land on the other side of a rounding boundary (6.35 shown as 6.3).
+    """
+    return reviews_df['score'].astype('float64')
+
+
 def build_album_stats_df(
     reviews_df: pd.DataFrame, albums_df: pd.DataFrame
 ) -> pd.DataFrame:
     """Per-album score aggregates joined with album metadata.
 
-    Columns: artist, album, requester, date, release_year, decade (when
-    available), plus mean/median/std/min/max/count.
+    Columns: album_id, artist, album, mean/median/std/min/max/count, plus
+    requester, date, release_year, decade (when available).
     """
     if reviews_df.empty:
         return pd.DataFrame()
+    stat_columns = ['mean', 'median', 'std', 'min', 'max']
     stats = (
-        reviews_df.groupby(['artist', 'album'])['score']
-        .agg(['mean', 'median', 'std', 'min', 'max', 'count'])
-        .reset_index()
+        _scores64(reviews_df)
+        .groupby(reviews_df['album_id'])
+        .agg([*stat_columns, 'count'])
+        .astype({c: float for c in stat_columns})
     )
     stats['std'] = stats['std'].fillna(0)
-    merged = stats.merge(albums_df, on=['artist', 'album'], how='left')
-    return merged.round(
-        {'mean': 2, 'median': 2, 'std': 2, 'min': 2, 'max': 2}
-    )
+    metadata = build_album_lookup(albums_df)
+    merged = stats.join(metadata, how='left').reset_index()
+    leading = ['album_id', 'artist', 'album', *stat_columns, 'count']
+    merged = merged[
+        leading + [c for c in merged.columns if c not in leading]
+    ]
+    return merged.round({c: 2 for c in stat_columns})
 
 
 def build_reviews_df(df: pd.DataFrame, listeners: list[str]) -> pd.DataFrame:
-    reviews_rows = [
+    """Reshape the wide sheet into one row per (listener, album) review.
+
+    Each listener owns a ``Name``/``Name.1``/``Name.2`` column triplet (score,
+    favorite track, least favorite track). The triplets are stacked in bulk
+    as NumPy blocks rather than row by row, so the cost is a handful of array
+    copies regardless of how many albums or listeners the sheet has. Rows
+    missing an artist or album, and reviews without a score, are dropped.
+
+    Names are categorical (sharing categories with ``build_albums_df``) and
+    scores are float32. ``listener_id`` is the listener's category code and
+    ``album_id`` matches ``build_albums_df``; joins and groupbys key on
+    these rather than on name strings.
+    """
+    columns = [
+        'listener_id',
+        'listener',
+        'album_id',
+        'artist',
+        'album',
+        'score',
+        'favorite_track',
+        'least_favorite_track',
+    ]
+    album_ids = _album_ids(df)
+    albums = df[album_ids >= 0]
+    if albums.empty or not listeners:
+        return pd.DataFrame(columns=columns)
+
+    def _stack(suffix: str) -> np.ndarray:
+        # Missing columns come back as NaN, matching the old ``row.get``.
+        block = albums.reindex(columns=[f'{name}{suffix}' for name in listeners])
+        return block.to_numpy().ravel()
+
+    n_albums, n_listeners = len(albums), len(listeners)
+    # Row-major ravel keeps the original album-then-listener ordering.
+    scores = _stack('')
+    people = _people_dtype(df, listeners)
+    reviews = pd.DataFrame(
         {
-            'listener': listener,
-            'artist': row['Artist'],
-            'album': row['Album'],
-            'score': score,
-            'favorite_track': row.get(f'{listener}.1'),
-            'least_favorite_track': row.get(f'{listener}.2'),
+            'listener_id': np.tile(
+                people.categories.get_indexer(listeners).astype(np.int32),
+                n_albums,
+            ),
+            'listener': np.tile(np.asarray(listeners, dtype=object), n_albums),
+            'album_id': np.repeat(album_ids[album_ids >= 0], n_listeners),
+            'artist': np.repeat(albums['Artist'].to_numpy(), n_listeners),
+            'album': np.repeat(albums['Album'].to_numpy(), n_listeners),
+            'score': scores,
+            'favorite_track': _stack('.1'),
+            'least_favorite_track': _stack('.2'),
+        },
+        columns=columns,
+    )
+    reviews = reviews[pd.notna(scores)].reset_index(drop=True)
+    return reviews.astype(
+        {
+            'listener': people,
+            'artist': _category_dtype(df['Artist']),
+            'album': _category_dtype(df['Album']),
+            'score': _SCORE_DTYPE,
+            'favorite_track': 'category',
+            'least_favorite_track': 'category',
         }
-        for _, row in df.iterrows()
-        if pd.notnull(row['Artist']) and pd.notnull(row['Album'])
-        for listener in listeners
-        if pd.notnull(score := row.get(listener))
-    ]
-    return pd.DataFrame(reviews_rows)
+    )
 
 
-def build_deviation_df(reviews_df: pd.DataFrame) -> pd.DataFrame:
-    users = reviews_df['listener'].unique()
-    similarity_matrix = pd.DataFrame(index=users, columns=users)
-
-    for user1 in users:
-        for user2 in users:
-            if user1 == user2:
-                continue
-
-            reviews1 = reviews_df[reviews_df['listener'] == user1]
-            reviews2 = reviews_df[reviews_df['listener'] == user2]
-            common_albums = set(reviews1['album']).intersection(reviews2['album'])
-
-            if common_albums:
-                merged_reviews = pd.merge(
-                    reviews1[reviews1['album'].isin(common_albums)],
-                    reviews2[reviews2['album'].isin(common_albums)],
-                    on=['artist', 'album'],
-                    suffixes=('_1', '_2'),
-                )
-                deviation_metric = np.sqrt(
-                    np.mean(
-                        (merged_reviews['score_1'] - merged_reviews['score_2']) ** 2
-                    )
-                )
-                similarity_matrix.loc[user1, user2] = deviation_metric.round(2)
-
-    similarity_matrix = similarity_matrix.fillna(0).infer_objects()
-    similarity_matrix.loc['average'] = similarity_matrix.mean().round(2)
+def _pairwise_deviation(
+    reviews_df: pd.DataFrame,
+) -> tuple[pd.Index, np.ndarray, np.ndarray]:
+    """RMS score deviation and shared-album counts for every listener pair.
+
+    Scores are pivoted into a listener x album matrix with a missing-value
+    mask, and the per-pair sums over shared albums come out of three masked
+    matrix products:
+
+        sum((a - b)^2) = a^2 . m_b + m_a . b^2 - 2 a . b
+
+    Returns the listener index, the RMS matrix (NaN where a pair shares no
+    albums, including the diagonal) and the shared-album count matrix.
+    """
+    # Rows in first-seen listener order, columns one per album_id.
+    rows, listener_ids = pd.factorize(reviews_df['listener_id'])
+    cols, album_ids = pd.factorize(reviews_df['album_id'])
+    names = build_listener_lookup(reviews_df)
+    users = pd.Index(names.loc[listener_ids].to_numpy(), dtype=object)
+
+    # Scatter scores into the matrix, averaging any duplicate reviews.
+    shape = (len(listener_ids), len(album_ids))
+    sums = np.zeros(shape)
+    counts = np.zeros(shape)
+    np.add.at(sums, (rows, cols), reviews_df['score'].to_numpy(dtype=float))
+    np.add.at(counts, (rows, cols), 1)
+    mask = counts > 0
+    scores = np.divide(sums, counts, out=np.zeros(shape), where=mask)
+    present = mask.astype(float)
+    squared = scores**2
+
+    overlap = present @ present.T
+    cross = squared @ present.T
+    sum_sq = cross + cross.T - 2 * (scores @ scores.T)
+    # Average with the transpose so the result is exactly symmetric despite
+    # floating-point summation order in the products.
+    sum_sq = np.clip((sum_sq + sum_sq.T) / 2, 0, None)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rms = np.sqrt(sum_sq / overlap)
+    rms[overlap == 0] = np.nan
+    np.fill_diagonal(rms, np.nan)
+    return users, rms, overlap.astype(int)
+
+
+def _deviation_frame(users: pd.Index, rms: np.ndarray) -> pd.DataFrame:
+    similarity_matrix = pd.DataFrame(
+        np.nan_to_num(rms.round(2), nan=0.0), index=users, columns=users
+    )
+    if len(users):
+        similarity_matrix.loc['average'] = similarity_matrix.mean().round(2)
     return similarity_matrix
 
 
+def build_deviation_frames(
+    reviews_df: pd.DataFrame,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """``build_deviation_df`` and ``build_overlap_df`` from one pass over
+    the score matrix."""
+    users, rms, overlap = _pairwise_deviation(reviews_df)
+    return (
+        _deviation_frame(users, rms),
+        pd.DataFrame(overlap, index=users, columns=users),
+    )
+
+
+def build_deviation_df(reviews_df: pd.DataFrame) -> pd.DataFrame:
+    """Pairwise RMS deviation between listeners plus an ``average`` row.
+
+    Pairs with no albums in common are reported as 0.
+    """
+    return build_deviation_frames(reviews_df)[0]
+
+
+def build_overlap_df(reviews_df: pd.DataFrame) -> pd.DataFrame:
+    """Number of albums each pair of listeners has both scored.
+
+    The diagonal is each listener's own review count.
+    """
+    return build_deviation_frames(reviews_df)[1]
+
+
+def mask_sparse_pairs(
+    deviation_df: pd.DataFrame, overlap_df: pd.DataFrame, min_overlap: int
+) -> pd.DataFrame:
+    """``deviation_df`` with pairs sharing fewer than ``min_overlap`` albums
+    blanked out (NaN) and the ``average`` row recomputed without them."""
+    if min_overlap <= 1:
+        return deviation_df
+    listeners = overlap_df.index
+    too_few = (overlap_df < min_overlap).reindex(
+        index=deviation_df.index, fill_value=False
+    )
+    masked = deviation_df.mask(too_few)
+    masked.loc['average'] = masked.loc[listeners].mean().round(2)
+    return masked
+
+
 def build_listener_requester_df(
     reviews_df: pd.DataFrame, albums_df: pd.DataFrame
 ) -> pd.DataFrame:
-    merged_df = pd.merge(reviews_df, albums_df, on=['artist', 'album'])
+    merged_df = pd.merge(
+        reviews_df, albums_df[['album_id', 'requester']], on='album_id'
+    )
     avg_scores_df = (
-        merged_df.groupby(['listener', 'requester'])['score']
+        _scores64(merged_df)
+        .groupby(
+            [merged_df['listener'], merged_df['requester']], observed=True
+        )
         .mean()
         .reset_index()
     )
     avg_scores_df['score'] = avg_scores_df['score'].round(1)
+    # Plain labels, so pages can add e.g. an "Average" column to a slice.
+    avg_scores_df = avg_scores_df.astype(
+        {'listener': object, 'requester': object}
+    )
     return avg_scores_df.pivot(index='listener', columns='requester', values='score')
 
 
-def ensure_session_state(sheets_doc_id: str) -> None:
-    """Populate session state with all derived dataframes.
+class Aggregates(NamedTuple):
+    """Summary tables shared by the home, Listeners and Stats pages."""
+
+    # album_stats_df sorted best-first.
+    albums: pd.DataFrame
+    # listener, mean, median, std, min, max, count.
+    listeners: pd.DataFrame
+    # requester, picks, avg_reception, best, worst, avg_received.
+    requesters: pd.DataFrame
+    # decade, albums, avg_score in chronological order.
+    decades: pd.DataFrame
+    # artist, album, <track column>, count, most-picked first.
+    favorite_tracks: pd.DataFrame
+    least_favorite_tracks: pd.DataFrame
+
+
+def _track_counts(
+    reviews_df: pd.DataFrame, album_lookup: pd.DataFrame, column: str
+) -> pd.DataFrame:
+    counts = (
+        reviews_df.groupby(['album_id', column], observed=True)
+        .size()
+        .rename('count')
+        .reset_index()
+        .sort_values(by='count', ascending=False, kind='stable')
+    )
+    names = album_lookup[['artist', 'album']]
+    counts = counts.join(names, on='album_id')
+    return counts[['artist', 'album', column, 'count']]
+
+
+def _decade_sort_key(decades: pd.Series) -> pd.Series:
+    # Sort decades numerically when possible (handles "60s", "1960s", etc.)
+    return (
+        decades.astype(str).str.extract(r'(\d+)', expand=False)
+        .astype(float)
+        .fillna(-1)
+    )
+
 
-    Safe to call from any page: if everything's already loaded we return
-    immediately, otherwise we load the sheet and build every derived frame
-    the app uses. This frees non-home pages from depending on whatever keys
-    happened to be set by the last Home-page run.
+def build_aggregates(
+    reviews_df: pd.DataFrame,
+    albums_df: pd.DataFrame,
+    album_stats_df: pd.DataFrame,
+) -> Aggregates:
+    """Album-, listener-, requester- and decade-level summary tables.
+
+    Album numbers come straight from ``album_stats_df``; everything else is
+    grouped once here so pages never have to re-run these groupbys.
     """
-    required = (
-        'albums_df',
-        'reviews_df',
-        'deviation_df',
-        'listener_requester_df',
-        'album_stats_df',
+    stat_columns = ['mean', 'median', 'std', 'min', 'max', 'count']
+    if reviews_df.empty:
+        return Aggregates(
+            albums=album_stats_df,
+            listeners=pd.DataFrame(columns=['listener', *stat_columns]),
+            requesters=pd.DataFrame(
+                columns=[
+                    'requester',
+                    'picks',
+                    'avg_reception',
+                    'best',
+                    'worst',
+                    'avg_received',
+                ]
+            ),
+            decades=pd.DataFrame(columns=['decade', 'albums', 'avg_score']),
+            favorite_tracks=pd.DataFrame(
+                columns=['artist', 'album', 'favorite_track', 'count']
+            ),
+            least_favorite_tracks=pd.DataFrame(
+                columns=['artist', 'album', 'least_favorite_track', 'count']
+            ),
+        )
+
+    albums = album_stats_df.sort_values('mean', ascending=False)
+    album_lookup = build_album_lookup(albums_df)
+
+    listeners = (
+        _scores64(reviews_df)
+        .groupby(reviews_df['listener'], observed=True)
+        .agg(stat_columns)
+        .astype({c: float for c in stat_columns if c != 'count'})
+        .reset_index()
+        .round(2)
     )
-    if all(k in st.session_state for k in required):
-        return
 
-    df = load_sheet(sheets_doc_id)
-    listeners = get_listeners(df)
-    albums_df = build_albums_df(df)
-    reviews_df = build_reviews_df(df, listeners)
-    st.session_state['albums_df'] = albums_df
-    st.session_state['reviews_df'] = reviews_df
-    st.session_state['deviation_df'] = build_deviation_df(reviews_df)
-    st.session_state['listener_requester_df'] = build_listener_requester_df(
-        reviews_df, albums_df
+    requesters = pd.DataFrame(
+        columns=['requester', 'picks', 'avg_reception', 'best', 'worst']
     )
-    st.session_state['album_stats_df'] = build_album_stats_df(
-        reviews_df, albums_df
+    if 'requester' in album_stats_df.columns:
+        requesters = (
+            album_stats_df.dropna(subset=['requester'])
+            .groupby('requester', observed=True)
+            .agg(
+                picks=('album', 'count'),
+                avg_reception=('mean', 'mean'),
+                best=('mean', 'max'),
+                worst=('mean', 'min'),
+            )
+            .reset_index()
+            .round(2)
+            .sort_values('avg_reception', ascending=False)
+        )
+        picked = reviews_df.merge(
+            albums_df[['album_id', 'requester']], on='album_id'
+        )
+        picked = picked[picked['listener'] != picked['requester']]
+        received = (
+            _scores64(picked)
+            .groupby(picked['requester'], observed=True)
+            .mean()
+            .rename('avg_received')
+        )
+        requesters = requesters.merge(
+            received, left_on='requester', right_index=True, how='left'
+        )
+
+    decades = pd.DataFrame(columns=['decade', 'albums', 'avg_score'])
+    if 'decade' in album_stats_df.columns:
+        decades = (
+            album_stats_df.dropna(subset=['decade'])
+            .groupby('decade')
+            .agg(albums=('album', 'count'), avg_score=('mean', 'mean'))
+            .reset_index()
+        )
+        order = _decade_sort_key(decades['decade']).argsort(kind='stable')
+        decades = decades.iloc[order.to_numpy()].reset_index(drop=True)
+        decades['avg_score'] = decades['avg_score'].round(2)
+
+    return Aggregates(
+        albums=albums,
+        listeners=listeners,
+        requesters=requesters,
+        decades=decades,
+        favorite_tracks=_track_counts(
+            reviews_df, album_lookup, 'favorite_track'
+        ),
+        least_favorite_tracks=_track_counts(
+            reviews_df, album_lookup, 'least_favorite_track'
+        ),
     )
+
+
+class StatsBundle(NamedTuple):
+    """Everything the Stats page shows that doesn't depend on its widgets.
+
+    Leaderboards are ``_LEADERBOARD_SIZE`` rows of ``album_stats_df``
+    restricted to the displayed columns; superlatives are single rows
+    (Series) of ``listener_stats``, or None when nobody qualifies.
+    """
+
+    # albums, reviews, listeners, mean, median, std, perfect_tens, zeros.
+    summary: dict[str, float]
+    top_album: pd.Series
+    bottom_album: pd.Series
+    top_albums: pd.DataFrame
+    bottom_albums: pd.DataFrame
+    divisive_albums: pd.DataFrame
+    unanimous_albums: pd.DataFrame
+    # listener, avg, median, spread, floor, ceiling, reviews.
+    listener_stats: pd.DataFrame
+    harshest: pd.Series
+    kindest: pd.Series
+    most_consistent: pd.Series | None
+    most_volatile: pd.Series | None
+    most_active: pd.Series
+    # listener, artist, album, score, club_avg, delta; furthest first.
+    hot_takes: pd.DataFrame
+
+
+_LEADERBOARD_SIZE = 10
+
+
+def build_stats_bundle(
+    reviews_df: pd.DataFrame,
+    album_stats_df: pd.DataFrame,
+    aggregates: Aggregates,
+) -> StatsBundle | None:
+    """Leaderboards and superlatives for the Stats page, or None when
+    there are no reviews.
+
+    Each table only needs its first few rows, so they are picked with
+    ``nlargest``/``nsmallest``/``idxmax`` rather than full sorts.
+    """
+    if reviews_df.empty:
+        return None
+    k = _LEADERBOARD_SIZE
+    scores = _scores64(reviews_df)
+    summary = {
+        'albums': len(album_stats_df),
+        'reviews': len(reviews_df),
+        'listeners': reviews_df['listener'].nunique(),
+        'mean': float(scores.mean()),
+        'median': float(scores.median()),
+        'std': float(scores.std()),
+        'perfect_tens': int((scores >= 10).sum()),
+        'zeros': int((scores <= 0).sum()),
+    }
+
+    columns = ['artist', 'album', 'mean', 'median', 'std', 'count']
+    if 'requester' in album_stats_df.columns:
+        columns.insert(2, 'requester')
+    top = album_stats_df.nlargest(k, 'mean')
+    bottom = album_stats_df.nsmallest(k, 'mean')
+    shared = album_stats_df[album_stats_df['count'] >= 2]
+    # keep='all' keeps every album tied with the k-th smallest spread, so
+    # the (std, -mean) tie-break below sees the same candidates a full
+    # sort would.
+    unanimous = shared.nsmallest(k, 'std', keep='all').sort_values(
+        ['std', 'mean'], ascending=[True, False]
+    )
+
+    listener_stats = aggregates.listeners.rename(
+        columns={
+            'mean': 'avg',
+            'std': 'spread',
+            'min': 'floor',
+            'max': 'ceiling',
+            'count': 'reviews',
+        }
+    )
+    avg = listener_stats['avg']
+    repeat = listener_stats[listener_stats['reviews'] >= 2]
+    spread = repeat['spread']
+
+    takes = reviews_df[['listener', 'album_id', 'score']].join(
+        album_stats_df.set_index('album_id')[['artist', 'album', 'mean']],
+        on='album_id',
+    )
+    takes['delta'] = takes['score'] - takes['mean']
+    hot_takes = (
+        takes.loc[takes['delta'].abs().nlargest(k).index]
+        [['listener', 'artist', 'album', 'score', 'mean', 'delta']]
+        .rename(columns={'mean': 'club_avg'})
+    )
+
+    return StatsBundle(
+        summary=summary,
+        top_album=top.iloc[0],
+        bottom_album=bottom.iloc[0],
+        top_albums=top[columns],
+        bottom_albums=bottom[columns],
+        divisive_albums=shared.nlargest(k, 'std')[columns],
+        unanimous_albums=unanimous.head(k)[columns],
+        listener_stats=listener_stats,
+        harshest=listener_stats.loc[avg.idxmin()],
+        kindest=listener_stats.loc[avg.idxmax()],
+        most_consistent=None if repeat.empty else repeat.loc[spread.idxmin()],
+        most_volatile=None if repeat.empty else repeat.loc[spread.idxmax()],
+        most_active=listener_stats.loc[listener_stats['reviews'].idxmax()],
+        hot_takes=hot_takes,
+    )
+
+
+class ChartData(NamedTuple):
+    """Pre-aggregated inputs for the Stats page charts.
+
+    Charts embed their data in the spec sent to the browser, so these hold
+    bins and one point per album rather than every review.
+    """
+
+    # bin_start, bin_end, reviews.
+    score_histogram: pd.DataFrame
+    # listener, bin_start, bin_end, reviews; empty bins left out.
+    listener_histogram: pd.DataFrame
+    # artist, album, release_year, mean for albums with a release year.
+    release_years: pd.DataFrame
+    # release_year, mean at both ends of the least-squares line.
+    release_year_trend: pd.DataFrame
+    # Pearson correlation of release year and mean score (NaN if undefined).
+    release_year_corr: float
+    # date, cumulative, artist, album, mean in date order.
+    timeline: pd.DataFrame
+
+
+_SCORE_BIN_WIDTH = 0.5
+
+
+def _score_histograms(
+    reviews_df: pd.DataFrame,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    scores = reviews_df['score'].to_numpy(dtype=float)
+    width = _SCORE_BIN_WIDTH
+    low = np.floor(scores.min() / width) * width
+    high = np.floor(scores.max() / width) * width + width
+    edges = np.arange(low, high + width / 2, width)
+    counts, _ = np.histogram(scores, bins=edges)
+    histogram = pd.DataFrame(
+        {'bin_start': edges[:-1], 'bin_end': edges[1:], 'reviews': counts}
+    )
+
+    # Every listener's histogram from one bincount over (listener, bin).
+    n_bins = len(counts)
+    bins = np.searchsorted(edges, scores, side='right') - 1
+    bins = np.clip(bins, 0, n_bins - 1)
+    listeners, codes = np.unique(
+        reviews_df['listener'].astype(str).to_numpy(), return_inverse=True
+    )
+    grid = np.bincount(
+        codes * n_bins + bins, minlength=len(listeners) * n_bins
+    ).reshape(len(listeners), n_bins)
+    rows, cols = np.nonzero(grid)
+    by_listener = pd.DataFrame(
+        {
+            'listener': listeners[rows],
+            'bin_start': edges[cols],
+            'bin_end': edges[cols + 1],
+            'reviews': grid[rows, cols],
+        }
+    )
+    return histogram, by_listener
+
+
+def build_chart_data(
+    reviews_df: pd.DataFrame,
+    albums_df: pd.DataFrame,
+    album_stats_df: pd.DataFrame,
+) -> ChartData | None:
+    """Chart inputs for the Stats page, or None when there are no reviews."""
+    if reviews_df.empty:
+        return None
+    score_histogram, listener_histogram = _score_histograms(reviews_df)
+
+    release_years = pd.DataFrame(
+        columns=['artist', 'album', 'release_year', 'mean']
+    )
+    if 'release_year' in album_stats_df.columns:
+        release_years = album_stats_df[
+            ['artist', 'album', 'release_year', 'mean']
+        ].assign(
+            release_year=lambda df: pd.to_numeric(
+                df['release_year'], errors='coerce'
+            )
+        ).dropna(subset=['release_year'])
+    years = release_years['release_year'].to_numpy(dtype=float)
+    means = release_years['mean'].to_numpy(dtype=float)
+    trend = pd.DataFrame(columns=['release_year', 'mean'])
+    corr = float('nan')
+    if len(years) >= 2 and np.ptp(years) > 0:
+        slope, intercept = np.polyfit(years, means, 1)
+        ends = np.array([years.min(), years.max()])
+        trend = pd.DataFrame(
+            {'release_year': ends, 'mean': slope * ends + intercept}
+        )
+        if np.ptp(means) > 0:
+            corr = float(np.corrcoef(years, means)[0, 1])
+
+    timeline = pd.DataFrame(
+        columns=['date', 'cumulative', 'artist', 'album', 'mean']
+    )
+    if 'date' in albums_df.columns and pd.api.types.is_datetime64_any_dtype(
+        albums_df['date']
+    ):
+        dated = albums_df[['album_id', 'date', 'artist', 'album']].dropna(
+            subset=['date']
+        )
+        dated = dated.sort_values('date', kind='stable')
+        timeline = dated.assign(
+            cumulative=np.arange(1, len(dated) + 1)
+        ).merge(
+            album_stats_df[['album_id', 'mean']], on='album_id', how='left'
+        )[['date', 'cumulative', 'artist', 'album', 'mean']]
+
+    return ChartData(
+        score_histogram=score_histogram,
+        listener_histogram=listener_histogram,
+        release_years=release_years,
+        release_year_trend=trend,
+        release_year_corr=corr,
+        timeline=timeline,
+    )
+
+
+class PartitionIndex:
+    """Precomputed per-listener row partitions of ``reviews_df``.
+
+    Built once per dataset, so looking up one listener's reviews is a dict
+    lookup plus a positional take instead of a boolean scan over every
+    review.
+    """
+
+    def __init__(self, reviews_df: pd.DataFrame):
+        self._reviews_df = reviews_df
+        self.listener_rows: dict[str, np.ndarray] = (
+            reviews_df.groupby('listener', observed=True).indices
+            if not reviews_df.empty
+            else {}
+        )
+
+    def reviews_by_listener(self, listener: str) -> pd.DataFrame:
+        rows = self.listener_rows.get(listener)
+        if rows is None:
+            return self._reviews_df.iloc[:0]
+        return self._reviews_df.iloc[rows]
+
+
+def build_frames(df: pd.DataFrame) -> dict[str, pd.DataFrame]:
+    """Run every builder over a loaded sheet, keyed by ``FRAME_NAMES``."""
+    with timing.stage('build.get_listeners'):
+        listeners = get_listeners(df)
+    with timing.stage('build.albums'):
+        albums_df = build_albums_df(df)
+    with timing.stage('build.reviews'):
+        reviews_df = build_reviews_df(df, listeners)
+    with timing.stage('build.deviation'):
+        deviation_df, overlap_df = build_deviation_frames(reviews_df)
+    with timing.stage('build.listener_requester'):
+        listener_requester_df = build_listener_requester_df(
+            reviews_df, albums_df
+        )
+    with timing.stage('build.album_stats'):
+        album_stats_df = build_album_stats_df(reviews_df, albums_df)
+    frames = {
+        'albums_df': albums_df,
+        'reviews_df': reviews_df,
+        'deviation_df': deviation_df,
+        'overlap_df': overlap_df,
+        'listener_requester_df': listener_requester_df,
+        'album_stats_df': album_stats_df,
+    }
+    if logger.isEnabledFor(logging.INFO):
+        for row in memory_report(frames).itertuples():
+            logger.info(
+                '%s: %d bytes before compaction, %d after',
+                row.frame,
+                row.before_bytes,
+                row.after_bytes,
+            )
+    return frames
+
+
+def snapshot_dir() -> str:
+    cache_dir = os.environ.get('RECORD_CLUB_CACHE_DIR', _DEFAULT_CACHE_DIR)
+    return os.path.join(cache_dir, 'snapshot')
+
+
+_snapshot_write_lock = threading.Lock()
+
+
+def save_snapshot(
+    frames: dict[str, pd.DataFrame], version: str, directory: str
+) -> None:
+    """Write ``frames`` as Parquet files tagged with ``version``.
+
+    Each snapshot goes in its own subdirectory and the ``CURRENT`` pointer
+    is swapped in atomically afterwards, so readers never see a half
+    written snapshot. Older snapshots are removed. Writers in this process
+    take turns, so one writer's cleanup can't delete a snapshot another is
+    still writing.
+    """
+    with _snapshot_write_lock:
+        _save_snapshot(frames, version, directory)
+
+
+def _save_snapshot(
+    frames: dict[str, pd.DataFrame], version: str, directory: str
+) -> None:
+    os.makedirs(directory, exist_ok=True)
+    target = tempfile.mkdtemp(prefix=f'{version[:16]}-', dir=directory)
+    for name in FRAME_NAMES:
+        frames[name].to_parquet(os.path.join(target, f'{name}.parquet'))
+    pointer = {
+        'version': version,
+        'schema': _SNAPSHOT_SCHEMA,
+        'path': os.path.basename(target),
+    }
+    fd, tmp_pointer = tempfile.mkstemp(dir=directory)
+    with os.fdopen(fd, 'w') as f:
+        json.dump(pointer, f)
+    os.replace(tmp_pointer, os.path.join(directory, 'CURRENT'))
+    for entry in os.listdir(directory):
+        path = os.path.join(directory, entry)
+        if os.path.isdir(path) and entry != pointer['path']:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def load_snapshot(
+    directory: str,
+) -> tuple[str, dict[str, pd.DataFrame]] | None:
+    """Return ``(version, frames)`` from the current snapshot, if usable.
+
+    Files are memory-mapped rather than read into a buffer first. Missing,
+    partial or outdated-schema snapshots return None.
+    """
+    try:
+        with open(os.path.join(directory, 'CURRENT')) as f:
+            pointer = json.load(f)
+        if pointer.get('schema') != _SNAPSHOT_SCHEMA:
+            return None
+        target = os.path.join(directory, pointer['path'])
+        frames = {
+            name: pd.read_parquet(
+                os.path.join(target, f'{name}.parquet'), memory_map=True
+            )
+            for name in FRAME_NAMES
+        }
+    except (OSError, ValueError, KeyError):
+        return None
+    return pointer['version'], frames
+
+
+class Dataset:
+    """One build of every derived frame, shared by all sessions.
+
+    Datasets are keyed by ``version`` (the sheet's content fingerprint) and
+    handed to sessions by reference, so the frames must be treated as
+    read-only: derive new frames from them rather than assigning into them.
+    """
+
+    def __init__(self, version: str, frames: dict[str, pd.DataFrame]):
+        self.version = version
+        self.frames = frames
+        for name in FRAME_NAMES:
+            setattr(self, name, frames[name])
+
+    # Derived tables below are computed on first use and then shared, so
+    # each is built at most once per dataset version.
+
+    @functools.cached_property
+    def partitions(self) -> PartitionIndex:
+        return PartitionIndex(self.reviews_df)
+
+    @functools.cached_property
+    def aggregates(self) -> Aggregates:
+        return build_aggregates(
+            self.reviews_df, self.albums_df, self.album_stats_df
+        )
+
+    @functools.cached_property
+    def stats(self) -> StatsBundle | None:
+        return build_stats_bundle(
+            self.reviews_df, self.album_stats_df, self.aggregates
+        )
+
+    @functools.cached_property
+    def charts(self) -> ChartData | None:
+        return build_chart_data(
+            self.reviews_df, self.albums_df, self.album_stats_df
+        )
+
+    @functools.cached_property
+    def chart_specs(self) -> dict[str, dict] | None:
+        if self.charts is None:
+            return None
+        return chart_specs.build_stats_specs(
+            self.charts, self.aggregates.decades
+        )
+
+    def warm(self) -> None:
+        """Build every derived table now rather than on first use."""
+        for name in (
+            'partitions',
+            'aggregates',
+            'stats',
+            'charts',
+            'chart_specs',
+        ):
+            getattr(self, name)
+
+
+# Process-wide registry of built datasets. Only the most recent few are
+# kept; sessions still holding an older one keep it alive themselves.
+_MAX_DATASETS = 2
+_datasets: dict[str, Dataset] = {}
+_latest_version: str | None = None
+# Guards the registry dict only, so looking a dataset up never waits on a
+# build. Builds and the first snapshot load take their own locks.
+_datasets_lock = threading.Lock()
+_build_lock = threading.Lock()
+_snapshot_lock = threading.Lock()
+
+
+def _register_dataset(dataset: Dataset) -> None:
+    global _latest_version
+    _datasets[dataset.version] = dataset
+    _latest_version = dataset.version
+    while len(_datasets) > _MAX_DATASETS:
+        del _datasets[next(iter(_datasets))]
+
+
+def latest_dataset() -> Dataset | None:
+    """The newest dataset this process knows about.
+
+    On the first call in a fresh process this loads the on-disk snapshot,
+    if there is one, without touching the network.
+    """
+    with _datasets_lock:
+        if _latest_version is not None:
+            return _datasets.get(_latest_version)
+    with _snapshot_lock:
+        with _datasets_lock:
+            if _latest_version is not None:
+                return _datasets.get(_latest_version)
+        with timing.stage('snapshot.load'):
+            snapshot = load_snapshot(snapshot_dir())
+        with _datasets_lock:
+            if snapshot is not None and _latest_version is None:
+                _register_dataset(Dataset(*snapshot))
+            return _datasets.get(_latest_version)
+
+
+def get_dataset(sheet: SheetDownload) -> Dataset:
+    """Return the dataset for ``sheet``, building it if no session has yet.
+
+    Builds run one at a time under their own lock, so concurrent sessions
+    asking for the same new version wait for one build instead of each
+    running it, while sessions that only need the current dataset
+    (``latest_dataset``) aren't held up at all.
+    """
+    with _datasets_lock:
+        dataset = _datasets.get(sheet.fingerprint)
+    if dataset is not None:
+        return dataset
+    return _build_dataset(sheet)[0]
+
+
+def _build_dataset(
+    sheet: SheetDownload, warm: bool = False
+) -> tuple[Dataset, bool]:
+    """Build, register and snapshot the dataset for ``sheet``.
+
+    Returns the dataset and whether this call built it: if another caller
+    registered the same version while we waited for ``_build_lock``, that
+    one is returned instead. ``warm`` builds the derived tables as well
+    before the dataset becomes visible.
+    """
+    with _build_lock:
+        with _datasets_lock:
+            dataset = _datasets.get(sheet.fingerprint)
+        if dataset is not None:
+            return dataset, False
+        with timing.stage('sheet.parse'):
+            df = _parse_sheet_cached(sheet.fingerprint, sheet.content)
+        with timing.stage('build.frames'):
+            dataset = Dataset(sheet.fingerprint, build_frames(df))
+        if warm:
+            with timing.stage('build.warm'):
+                dataset.warm()
+        with _datasets_lock:
+            _register_dataset(dataset)
+    try:
+        with timing.stage('snapshot.save'):
+            save_snapshot(dataset.frames, dataset.version, snapshot_dir())
+    except OSError:
+        # A read-only or full disk only costs us the faster next cold start.
+        pass
+    return dataset, True
+
+
+def refresh_interval() -> float:
+    """Seconds between background sheet checks; 0 turns them off."""
+    return float(
+        os.environ.get('RECORD_CLUB_REFRESH_SECONDS', _REFRESH_SECONDS)
+    )
+
+
+class SheetRefresher:
+    """Re-checks the sheet every ``interval`` seconds on a daemon thread.
+
+    When the sheet's content has changed, the new dataset (derived tables
+    included) is built on this thread and then registered, so sessions
+    switch to it on their next rerun without waiting on Google Sheets or
+    the build. A failed check is logged and the current dataset kept.
+    """
+
+    def __init__(self, sheets_doc_id: str, interval: float):
+        self.sheets_doc_id = sheets_doc_id
+        self.interval = interval
+        # Set once the first check has finished, whether or not it worked.
+        self.ready = threading.Event()
+        self.last_checked: float | None = None
+        self.last_error: Exception | None = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name='sheet-refresher', daemon=True
+        )
+
+    def start(self) -> 'SheetRefresher':
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def refresh(self) -> Dataset | None:
+        """Check the sheet once. Returns the new dataset, if there is one."""
+        with timing.stage('refresh.fetch'):
+            sheet = download_sheet(self.sheets_doc_id)
+        current = latest_dataset()
+        if current is not None and current.version == sheet.fingerprint:
+            return None
+        dataset, built = _build_dataset(sheet, warm=True)
+        if not built:
+            # Already registered: a session built it first, or the sheet
+            # went back to an earlier version. Either way it's current now.
+            with _datasets_lock:
+                _register_dataset(dataset)
+            return dataset
+        logger.info('Sheet refreshed to version %s', dataset.version[:12])
+        return dataset
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.refresh()
+                self.last_error = None
+            except Exception as e:
+                logger.warning('Sheet refresh failed', exc_info=True)
+                self.last_error = e
+            finally:
+                self.last_checked = time.time()
+                self.ready.set()
+            if self._stop.wait(self.interval):
+                return
+
+
+_refreshers: dict[str, SheetRefresher] = {}
+_refreshers_lock = threading.Lock()
+
+
+def refreshers() -> list[SheetRefresher]:
+    """Every sheet refresher running in this process."""
+    with _refreshers_lock:
+        return list(_refreshers.values())
+
+
+def start_refresher(sheets_doc_id: str) -> SheetRefresher | None:
+    """The running refresher for ``sheets_doc_id``, started on first call.
+
+    Returns None when background refresh is turned off.
+    """
+    interval = refresh_interval()
+    if interval <= 0:
+        return None
+    with _refreshers_lock:
+        refresher = _refreshers.get(sheets_doc_id)
+        if refresher is None:
+            refresher = SheetRefresher(sheets_doc_id, interval).start()
+            _refreshers[sheets_doc_id] = refresher
+        return refresher
+
+
+def _attach_dataset(dataset: Dataset) -> None:
+    st.session_state['dataset'] = dataset
+    st.session_state['dataset_version'] = dataset.version
+    for name in FRAME_NAMES:
+        st.session_state[name] = dataset.frames[name]
+
+
+@timing.timed('session.ensure')
+def ensure_session_state(sheets_doc_id: str) -> None:
+    """Point session state at the shared derived dataframes.
+
+    Safe to call from any page: if the session's dataset was built from the
+    sheet as it currently stands (same content fingerprint) we return
+    immediately, otherwise we attach the process-wide dataset for the
+    current sheet, building it only if no other session already has. This
+    frees non-home pages from depending on whatever keys happened to be set
+    by the last Home-page run.
+
+    A brand-new session starts from the newest dataset the process already
+    has (or the on-disk snapshot), so the first paint doesn't wait on
+    Google Sheets; the fingerprint is checked on the session's next run.
+
+    With the background refresher running (see ``SheetRefresher``) no run
+    touches the network: each one attaches the newest dataset the
+    refresher has built. Only a process with no dataset and no snapshot
+    waits, once, for the refresher's first check.
+    """
+    refresher = start_refresher(sheets_doc_id)
+    if refresher is not None:
+        dataset = latest_dataset()
+        if dataset is None:
+            refresher.ready.wait()
+            dataset = latest_dataset()
+        if dataset is not None:
+            if st.session_state.get('dataset_version') != dataset.version:
+                _attach_dataset(dataset)
+            return
+        # The first check failed: fetch here so the error reaches the page.
+
+    if 'dataset' not in st.session_state:
+        dataset = latest_dataset()
+        if dataset is not None:
+            _attach_dataset(dataset)
+            return
+
+    with timing.stage('sheet.fetch'):
+        sheet = fetch_sheet(sheets_doc_id)
+    if st.session_state.get('dataset_version') == sheet.fingerprint and all(
+        k in st.session_state for k in FRAME_NAMES
+    ):
+        return
+
+    with timing.stage('dataset.get'):
+        dataset = get_dataset(sheet)
+    _attach_dataset(dataset)
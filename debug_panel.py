@@ -0,0 +1,64 @@
+"""Hidden diagnostics panel, shown in the sidebar when a page is opened
+with ``?debug=1``."""
+import time
+
+import pandas as pd
+import streamlit as st
+
+import data
+import last_fm
+import timing
+
+
+def render() -> None:
+    if st.query_params.get('debug') != '1':
+        return
+    with st.sidebar.expander('Debug', expanded=True):
+        st.markdown('**Stage timings** (recent runs, this process)')
+        if not timing.enabled():
+            st.caption('Timing is off. Set RECORD_CLUB_TIMING=1 and restart.')
+        else:
+            rows = timing.summary()
+            if rows:
+                st.dataframe(
+                    pd.DataFrame(rows).set_index('stage'),
+                    use_container_width=True,
+                )
+            else:
+                st.caption('No stages recorded yet.')
+
+        st.markdown('**Last.fm memory caches**')
+        st.dataframe(
+            pd.DataFrame(last_fm.cache_stats()).T, use_container_width=True
+        )
+        health = last_fm.health()
+        st.caption(
+            f"Last.fm circuit {health['circuit']}; "
+            f"{health['recent_failures']} recent failures, "
+            f"{health['skipped_calls']} calls skipped."
+        )
+
+        for refresher in data.refreshers():
+            if refresher.last_checked is None:
+                st.caption('Sheet refresher: first check running.')
+                continue
+            age = time.time() - refresher.last_checked
+            status = 'ok' if refresher.last_error is None else 'failing'
+            st.caption(
+                f'Sheet refresher: last checked {age:.0f}s ago ({status}), '
+                f'every {refresher.interval:.0f}s.'
+            )
+
+        dataset = st.session_state.get('dataset')
+        if dataset is not None:
+            st.markdown(f'**Dataset** `{dataset.version[:12]}`')
+            st.dataframe(
+                pd.Series(
+                    {
+                        name: data.frame_memory(df)
+                        for name, df in dataset.frames.items()
+                    },
+                    name='bytes',
+                ),
+                use_container_width=True,
+            )
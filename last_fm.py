@@ -1,39 +1,420 @@
-from urllib.parse import urlencode
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterable, Iterator, NamedTuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
 from io import BytesIO
+import os
+import random
+import threading
+import time
 import requests
+from requests.adapters import HTTPAdapter
 import streamlit as st
 
-_DEFAULT_IMAGE_SIZE = 'large'
+import last_fm_cache
+import timing
+
+# Album art sizes to use, best first. ``extralarge`` is 300px, so both
+# page widths below are downscales of it; ``large`` (174px) is the fallback
+# for albums without one.
+_IMAGE_SIZES = ('extralarge', 'large')
 _USER_AGENT = 'RecordClub/1.0'
+_DEFAULT_MAX_WORKERS = 8
+
+# Widths the pages render album art at: the home-page grid columns and the
+# Listeners page's favorite/least-favorite covers.
+GRID_ART_WIDTH = 200
+DETAIL_ART_WIDTH = 300
+
+# (connect, read) seconds. Connect is just over a multiple of the 3s TCP
+# retransmission window.
+_DEFAULT_TIMEOUT = (3.05, 10)
+_DEFAULT_MAX_RETRIES = 3
+_BACKOFF_BASE = 0.5
+_BACKOFF_CAP = 8.0
+_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# Last.fm API error codes that mean "try again later": operation failed,
+# service offline, temporarily unavailable and rate limit exceeded.
+_RETRY_API_ERRORS = frozenset({8, 11, 16, 29})
+# A request that failed isn't tried again for this many seconds.
+_FAILURE_TTL = 60
+# Consecutive outages (connection errors, timeouts, 429/5xx) that open the
+# circuit breaker, and how long it stays open before a trial call.
+_BREAKER_THRESHOLD = 5
+_BREAKER_RESET_SECONDS = 30
+
+
+def _backoff_delay(attempt):
+    """Full-jitter exponential backoff for the given (0-based) attempt."""
+    return random.uniform(0, min(_BACKOFF_CAP, _BACKOFF_BASE * 2**attempt))
+
+
+def _retry_after(response):
+    try:
+        seconds = float(response.headers['Retry-After'])
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
+    return max(0.0, seconds)
+
+
+def _api_error(response):
+    try:
+        payload = response.json()
+    except ValueError:
+        return None
+    return payload.get('error') if isinstance(payload, dict) else None
+
+
+class LastFmApiError(Exception):
+    """Last.fm answered with an ``error`` payload instead of data."""
+
+    def __init__(self, code, message=None, response=None):
+        super().__init__(f'Last.fm error {code}: {message or "unknown"}')
+        self.code = code
+        self.response = response
+
+
+def _raise_for_api_error(payload, response=None):
+    if isinstance(payload, dict) and 'error' in payload:
+        raise LastFmApiError(
+            payload['error'], payload.get('message'), response=response
+        )
+
+
+class HttpClient:
+    """Keep-alive connection pool with timeouts and jittered retries.
+
+    Connection errors, timeouts, 429/5xx responses and Last.fm's own
+    "try again later" API errors are retried up to ``max_retries`` times,
+    waiting for ``Retry-After`` when the server sends one and a jittered
+    exponential backoff otherwise. A ``Retry-After`` longer than
+    ``_BACKOFF_CAP`` isn't waited out in the request: the response is
+    returned as it is, and ``_guarded`` keeps the circuit breaker open for
+    that long instead.
+    """
+
+    def __init__(
+        self,
+        pool_size=_DEFAULT_MAX_WORKERS,
+        timeout=_DEFAULT_TIMEOUT,
+        max_retries=_DEFAULT_MAX_RETRIES,
+        sleep=time.sleep,
+    ):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self._sleep = sleep
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = _USER_AGENT
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def get(self, url, check_api_error=False):
+        attempt = 0
+        while True:
+            try:
+                response = self.session.get(url, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.max_retries:
+                    raise
+                self._sleep(_backoff_delay(attempt))
+                attempt += 1
+                continue
+            should_retry = (
+                response.status_code in _RETRY_STATUSES
+                or check_api_error
+                and _api_error(response) in _RETRY_API_ERRORS
+            )
+            if not should_retry or attempt >= self.max_retries:
+                return response
+            delay = _retry_after(response)
+            if delay is not None and delay > _BACKOFF_CAP:
+                return response
+            self._sleep(_backoff_delay(attempt) if delay is None else delay)
+            attempt += 1
+
+    @timing.timed('lastfm.get_json')
+    def get_json(self, url):
+        """Decoded JSON for ``url``.
+
+        Raises ``LastFmApiError`` for an ``error`` payload, even one sent
+        with a 4xx/5xx status, and ``HTTPError`` for other bad statuses.
+        """
+        response = self.get(url, check_api_error=True)
+        if _api_error(response) is not None:
+            _raise_for_api_error(response.json(), response)
+        response.raise_for_status()
+        return response.json()
+
+    @timing.timed('lastfm.get_bytes')
+    def get_bytes(self, url):
+        response = self.get(url)
+        response.raise_for_status()
+        return response.content
+
+
+class LastFmUnavailable(Exception):
+    """Raised instead of calling Last.fm, because the same request failed
+    moments ago or the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Stops calling Last.fm after ``threshold`` outages in a row.
+
+    Once open, ``allow`` refuses calls for ``reset_after`` seconds, then
+    lets a single trial call through: success closes the circuit, another
+    outage opens it again. An outage that came with a ``Retry-After``
+    opens it straight away, for at least that long.
+    """
+
+    def __init__(
+        self,
+        threshold=_BREAKER_THRESHOLD,
+        reset_after=_BREAKER_RESET_SECONDS,
+        clock=time.monotonic,
+    ):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._open_for = reset_after
+        self._trial = False
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if self._trial:
+                return 'half-open'
+            if self._clock() - self._opened_at >= self._open_for:
+                return 'half-open'
+            return 'open'
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial or self._clock() - self._opened_at < self._open_for:
+                return False
+            self._trial = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_inconclusive(self):
+        """A call failed for reasons unrelated to Last.fm's health: end a
+        half-open trial without closing the circuit, so the next call
+        becomes the trial instead."""
+        with self._lock:
+            self._trial = False
+
+    def record_failure(self, retry_after=None):
+        with self._lock:
+            self._failures += 1
+            if self._trial or self._failures >= self.threshold or retry_after:
+                self._opened_at = self._clock()
+                self._open_for = max(self.reset_after, retry_after or 0)
+                self._trial = False
+
+    def reset(self):
+        self.record_success()
+
+
+def _is_outage(error):
+    """Whether ``error`` says Last.fm is down, rather than that this one
+    request can't be answered."""
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(error, LastFmApiError):
+        return error.code in _RETRY_API_ERRORS
+    response = getattr(error, 'response', None)
+    return (
+        isinstance(error, requests.HTTPError)
+        and response is not None
+        and (response.status_code == 429 or response.status_code >= 500)
+    )
+
+
+def _archive_key(url):
+    """``url`` with the API key dropped and the query sorted, so recordings
+    don't hold the key and replay under any key."""
+    parts = urlsplit(url)
+    query = sorted(
+        (name, value)
+        for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if name != 'api_key'
+    )
+    return parts._replace(query=urlencode(query)).geturl()
+
 
+class ArchiveHttpClient:
+    """Stand-in for ``HttpClient`` that records to or replays from a
+    ``ResponseArchive``.
 
-@st.cache_resource
-def _get_album_art(url):
-    headers = {'User-Agent': _USER_AGENT}
-    res = requests.get(url, headers=headers)
-    return BytesIO(res.content)
+    In ``'record'`` mode every request goes through ``http`` (a fresh
+    ``HttpClient`` by default) and the response is saved. In ``'replay'``
+    mode the network is never used: recorded responses are served after
+    ``latency`` seconds, and anything that wasn't recorded raises
+    ``LookupError``.
+    """
 
+    MODES = ('record', 'replay')
 
-@st.cache_resource
-def _make_call(url):
-    headers = {'User-Agent': _USER_AGENT}
-    response = requests.get(url, headers=headers)
-    response.raise_for_status()
-    return response.json()
+    def __init__(
+        self, archive, mode='replay', http=None, latency=0.0, sleep=time.sleep
+    ):
+        if mode not in self.MODES:
+            raise ValueError(
+                f'Unknown archive mode {mode!r}; expected one of {self.MODES}'
+            )
+        self.archive = archive
+        self.mode = mode
+        self.latency = latency
+        self._sleep = sleep
+        self._http = (http or HttpClient()) if mode == 'record' else None
+
+    def _replay(self, value, url):
+        if value is None:
+            raise LookupError(f'No recorded response for {_archive_key(url)}')
+        if self.latency:
+            self._sleep(self.latency)
+        return value
+
+    def get_json(self, url):
+        key = _archive_key(url)
+        if self.mode == 'replay':
+            payload = self._replay(self.archive.get_json(key), url)
+            _raise_for_api_error(payload)
+            return payload
+        payload = self._http.get_json(url)
+        self.archive.put_json(key, payload)
+        return payload
+
+    def get_bytes(self, url):
+        key = _archive_key(url)
+        if self.mode == 'replay':
+            return self._replay(self.archive.get_bytes(key), url)
+        content = self._http.get_bytes(url)
+        self.archive.put_bytes(key, content)
+        return content
+
+
+# In-process caches for API responses and image bytes, each with its own
+# memory budget.
+_METADATA_CACHE_BYTES = 16 * 1024 * 1024
+_ART_CACHE_BYTES = 64 * 1024 * 1024
+_metadata_cache = last_fm_cache.ByteLRU(
+    _METADATA_CACHE_BYTES, last_fm_cache.json_size
+)
+_art_cache = last_fm_cache.ByteLRU(_ART_CACHE_BYTES, len)
+_failures = last_fm_cache.FailureCache(_FAILURE_TTL)
+_breaker = CircuitBreaker()
+
+
+def _guarded(key, load):
+    """Call ``load`` unless ``key`` failed recently or Last.fm is down.
+
+    A failure is remembered for ``_FAILURE_TTL`` seconds, and outages count
+    towards opening the circuit breaker (or open it outright when Last.fm
+    sent ``Retry-After``). Skipped calls raise
+    ``LastFmUnavailable`` straight away.
+    """
+    message = _failures.get(key)
+    if message is not None:
+        raise LastFmUnavailable(message)
+    if not _breaker.allow():
+        raise LastFmUnavailable('Last.fm is unreachable; skipping for now')
+    try:
+        value = load()
+    except Exception as e:
+        _failures.put(key, e)
+        # Anything else (not found, bad JSON, nothing recorded) says
+        # nothing about Last.fm's health: it neither counts towards
+        # opening the breaker nor closes it.
+        if _is_outage(e):
+            response = getattr(e, 'response', None)
+            _breaker.record_failure(retry_after=_retry_after(response))
+        else:
+            _breaker.record_inconclusive()
+        raise
+    _breaker.record_success()
+    return value
+
+
+@st.cache_resource(show_spinner=False)
+def _default_http():
+    return HttpClient()
+
+
+def _get_album_art(url, http=None):
+    http = http or _default_http()
+    image_bytes = _art_cache.get_or_load(
+        url, lambda: _guarded(url, lambda: http.get_bytes(url))
+    )
+    return BytesIO(image_bytes)
+
+
+def _make_call(url, http=None):
+    http = http or _default_http()
+    return _metadata_cache.get_or_load(
+        url, lambda: _guarded(url, lambda: http.get_json(url))
+    )
+
+
+def _get_thumbnail(url, width, thumbnail_store, http):
+    def load():
+        thumbnail = thumbnail_store.get(url, width)
+        if thumbnail is not None:
+            return thumbnail
+        image_bytes = _guarded(url, lambda: http.get_bytes(url))
+        try:
+            with timing.stage('lastfm.thumbnail_ingest'):
+                thumbnail_store.ingest(url, image_bytes)
+        except Exception:
+            # Not something Pillow can read; hand back the original.
+            return image_bytes
+        return thumbnail_store.get(url, width)
+
+    return BytesIO(_art_cache.get_or_load((url, width), load))
+
+
+def cache_stats():
+    """Size and hit/miss/eviction counters for the in-memory caches."""
+    return {
+        'metadata': _metadata_cache.stats(),
+        'art': _art_cache.stats(),
+    }
+
+
+def health():
+    """Circuit breaker state and the negative cache's size and hits."""
+    return {
+        'circuit': _breaker.state,
+        'recent_failures': len(_failures),
+        'skipped_calls': _failures.hits,
+    }
 
 
 class Album:
-    def __init__(self, get_album_response):
+    def __init__(self, get_album_response, thumbnail_store=None, http=None):
+        self._thumbnail_store = thumbnail_store
+        self._http = http
         album_data = get_album_response.get('album', {})
         self.artist = album_data.get('artist')
         self.title = album_data.get('name')
+        images = {
+            img.get('size'): img.get('#text')
+            for img in album_data.get('image', [])
+            if img.get('#text')
+        }
         self.image_url = next(
-            (
-                img.get('#text')
-                for img in album_data.get('image', [])
-                if img.get('size') == _DEFAULT_IMAGE_SIZE
-            ),
-            None,
+            (images[size] for size in _IMAGE_SIZES if size in images), None
         )
         self.tracks = [
             {
@@ -54,14 +435,46 @@ class Album:
         self.listeners = album_data.get('listeners')
         self.playcount = album_data.get('playcount')
 
-    def get_album_art(self):
-        return _get_album_art(self.image_url)
+    def get_album_art(self, width=None):
+        """Album art bytes, pre-sized to ``width`` when a thumbnail store
+        is configured and keeps that width; otherwise the original image."""
+        if not self.image_url:
+            raise LookupError(f'No album art for {self.artist} - {self.title}')
+        store = self._thumbnail_store
+        if width is not None and store is not None and width in store.widths:
+            http = self._http or _default_http()
+            return _get_thumbnail(self.image_url, width, store, http)
+        return _get_album_art(self.image_url, self._http)
+
+
+class AlbumFetch(NamedTuple):
+    """Outcome of fetching one album (and optionally its art).
+
+    ``index`` is the position of the request in the input list, so callers
+    can restore the original order. Exactly one of ``album_data`` and
+    ``error`` is set.
+    """
+
+    index: int
+    artist: str
+    album: str
+    album_data: Album | None
+    album_art: BytesIO | None
+    error: Exception | None
 
 
 class LastFmClient:
-    def __init__(self, api_key):
+    def __init__(
+        self, api_key, metadata_store=None, thumbnail_store=None, http=None
+    ):
         self.api_key = api_key
         self.base_url = 'https://ws.audioscrobbler.com/2.0/'
+        self.http = http or HttpClient()
+        self.metadata_store = metadata_store
+        self.thumbnail_store = thumbnail_store
+        self._refresh_lock = threading.Lock()
+        self._refreshing = set()
+        self._refresher = None
 
     def _build_url(self, method, params):
         params.update(
@@ -72,5 +485,130 @@ class LastFmClient:
     def get_album(self, artist, album):
         params = {'artist': artist, 'album': album, 'autocorrect': 1}
         url = self._build_url('album.getinfo', params)
-        res = _make_call(url)
-        return Album(res) if res else None
+        if self.metadata_store is not None:
+            cached = self.metadata_store.get(artist, album)
+            if cached is not None:
+                payload, stale = cached
+                if stale:
+                    self._schedule_refresh(artist, album, url)
+                return self._album(payload)
+        res = _make_call(url, self.http)
+        if res and 'album' in res and self.metadata_store is not None:
+            self.metadata_store.put(artist, album, res)
+        return self._album(res) if res else None
+
+    def _album(self, response):
+        return Album(response, self.thumbnail_store, self.http)
+
+    def _schedule_refresh(self, artist, album, url):
+        key = last_fm_cache.normalize_key(artist, album)
+        with self._refresh_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            if self._refresher is None:
+                self._refresher = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix='lastfm-refresh'
+                )
+        self._refresher.submit(self._refresh, key, artist, album, url)
+
+    def _refresh(self, key, artist, album, url):
+        # Bypasses _make_call's memo so the store gets a fresh response;
+        # on failure the stale entry keeps being served.
+        try:
+            res = _guarded(url, lambda: self.http.get_json(url))
+            if res and 'album' in res:
+                self.metadata_store.put(artist, album, res)
+        except Exception:
+            pass
+        finally:
+            with self._refresh_lock:
+                self._refreshing.discard(key)
+
+    @timing.timed('lastfm.fetch_album')
+    def _fetch_one(self, index, artist, album, with_art, art_width):
+        try:
+            album_data = self.get_album(artist, album)
+            if album_data is None:
+                raise LookupError(f'No Last.fm data for {artist} - {album}')
+            album_art = (
+                album_data.get_album_art(art_width) if with_art else None
+            )
+        except Exception as e:
+            return AlbumFetch(index, artist, album, None, None, e)
+        return AlbumFetch(index, artist, album, album_data, album_art, None)
+
+    def fetch_albums(
+        self,
+        albums: Iterable[tuple[str, str]],
+        with_art: bool = True,
+        art_width: int | None = None,
+        max_workers: int = _DEFAULT_MAX_WORKERS,
+    ) -> Iterator[AlbumFetch]:
+        """Fetch many (artist, album) pairs concurrently.
+
+        Results are yielded as they finish, not in input order, so callers
+        can update progress as they go. Failures are yielded with ``error``
+        set rather than raised. ``art_width`` is passed through to
+        ``Album.get_album_art``.
+        """
+        albums = list(albums)
+        if not albums:
+            return
+        workers = max(1, min(max_workers, len(albums)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(
+                    self._fetch_one, index, artist, album, with_art, art_width
+                )
+                for index, (artist, album) in enumerate(albums)
+            ]
+            for future in as_completed(futures):
+                yield future.result()
+
+
+@st.cache_resource(show_spinner=False)
+def get_client(api_key):
+    """Process-wide client backed by the on-disk metadata and art stores.
+
+    The stores live under ``RECORD_CLUB_CACHE_DIR`` (default ``.cache``) and
+    metadata goes stale after ``LAST_FM_METADATA_TTL`` seconds (default a
+    week).
+
+    Setting ``LAST_FM_ARCHIVE`` to ``record`` or ``replay`` routes requests
+    through an ``ArchiveHttpClient`` over ``LAST_FM_ARCHIVE_DIR`` (default
+    ``last_fm_archive`` in the cache directory), with replays delayed by
+    ``LAST_FM_REPLAY_LATENCY`` seconds (default none).
+    """
+    cache_dir = os.environ.get(
+        'RECORD_CLUB_CACHE_DIR', last_fm_cache.DEFAULT_CACHE_DIR
+    )
+    ttl = float(
+        os.environ.get(
+            'LAST_FM_METADATA_TTL', last_fm_cache.DEFAULT_METADATA_TTL
+        )
+    )
+    store = last_fm_cache.MetadataStore(
+        os.path.join(cache_dir, 'last_fm.sqlite'), ttl=ttl
+    )
+    thumbnails = last_fm_cache.ThumbnailStore(
+        os.path.join(cache_dir, 'art'),
+        widths=(GRID_ART_WIDTH, DETAIL_ART_WIDTH),
+    )
+    http = None
+    archive_mode = os.environ.get('LAST_FM_ARCHIVE')
+    if archive_mode:
+        archive = last_fm_cache.ResponseArchive(
+            os.environ.get(
+                'LAST_FM_ARCHIVE_DIR',
+                os.path.join(cache_dir, 'last_fm_archive'),
+            )
+        )
+        http = ArchiveHttpClient(
+            archive,
+            mode=archive_mode,
+            latency=float(os.environ.get('LAST_FM_REPLAY_LATENCY', 0)),
+        )
+    return LastFmClient(
+        api_key, metadata_store=store, thumbnail_store=thumbnails, http=http
+    )
@@ -0,0 +1,330 @@
+"""Caches for Last.fm data.
+
+``ByteLRU`` bounds what the process keeps in memory; ``MetadataStore`` and
+``ThumbnailStore`` persist responses and artwork on disk so they survive
+restarts and redeploys. ``ResponseArchive`` keeps raw responses verbatim
+for record/replay runs. ``FailureCache`` remembers recent failures so they
+aren't retried on every rerun.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from io import BytesIO
+from typing import Any, Callable, Hashable
+
+from PIL import Image
+
+DEFAULT_CACHE_DIR = '.cache'
+DEFAULT_METADATA_TTL = 7 * 24 * 60 * 60
+_THUMBNAIL_FORMAT = 'WEBP'
+_THUMBNAIL_QUALITY = 80
+
+
+def normalize_key(artist: str, album: str) -> str:
+    """Case- and whitespace-insensitive key for an (artist, album) pair."""
+    return '\x1f'.join(
+        ' '.join(str(part).casefold().split()) for part in (artist, album)
+    )
+
+
+class ByteLRU:
+    """Thread-safe least-recently-used cache bounded by total payload size.
+
+    ``sizeof`` reports the size in bytes of a value; entries are evicted
+    oldest-use-first until the total fits in ``max_bytes``. Values larger
+    than the whole budget are returned to the caller but never stored.
+    """
+
+    def __init__(self, max_bytes: int, sizeof: Callable[[Any], int]):
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Hashable, tuple[Any, int]] = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        size = self._sizeof(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def get_or_load(self, key: Hashable, load: Callable[[], Any]) -> Any:
+        """Return the cached value for ``key``, calling ``load`` on a miss.
+
+        Exceptions from ``load`` propagate and nothing is cached.
+        """
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            value = load()
+            self.put(key, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+class FailureCache:
+    """Thread-safe negative cache: which keys failed, and why, for the
+    last ``ttl`` seconds. At most ``max_entries`` are kept, oldest dropped
+    first."""
+
+    def __init__(
+        self,
+        ttl: float,
+        max_entries: int = 1024,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Hashable, tuple[float, str]] = OrderedDict()
+        self.hits = 0
+
+    def get(self, key: Hashable) -> str | None:
+        """The error message ``key`` failed with, if it failed recently."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, message = entry
+            if expires <= self._clock():
+                del self._entries[key]
+                return None
+            self.hits += 1
+            return message
+
+    def put(self, key: Hashable, error: Exception) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (self._clock() + self.ttl, str(error))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def json_size(payload: Any) -> int:
+    """Approximate in-memory footprint of a decoded JSON payload."""
+    return len(json.dumps(payload, separators=(',', ':')))
+
+
+class MetadataStore:
+    """SQLite-backed store of ``album.getinfo`` responses.
+
+    Entries older than ``ttl`` seconds are still returned but flagged as
+    stale, so callers can serve them immediately and refresh in the
+    background.
+    """
+
+    def __init__(self, path: str, ttl: float = DEFAULT_METADATA_TTL):
+        self.path = path
+        self.ttl = ttl
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS album_info ('
+                ' key TEXT PRIMARY KEY,'
+                ' payload TEXT NOT NULL,'
+                ' fetched_at REAL NOT NULL)'
+            )
+
+    def get(self, artist: str, album: str) -> tuple[dict, bool] | None:
+        """Return ``(payload, is_stale)``, or None if nothing is stored."""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT payload, fetched_at FROM album_info WHERE key = ?',
+                (normalize_key(artist, album),),
+            ).fetchone()
+        if row is None:
+            return None
+        payload, fetched_at = row
+        return json.loads(payload), time.time() - fetched_at > self.ttl
+
+    def put(self, artist: str, album: str, payload: dict) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO album_info (key, payload, fetched_at)'
+                ' VALUES (?, ?, ?)',
+                (normalize_key(artist, album), json.dumps(payload), time.time()),
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                'SELECT COUNT(*) FROM album_info'
+            ).fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def _write_atomic(path: str, content: bytes) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _resize(image_bytes: bytes, width: int) -> bytes:
+    """Downscale to at most ``width`` pixels wide (never upscale)."""
+    with Image.open(BytesIO(image_bytes)) as image:
+        if image.mode not in ('RGB', 'RGBA'):
+            has_alpha = image.mode in ('LA', 'P') or 'transparency' in image.info
+            image = image.convert('RGBA' if has_alpha else 'RGB')
+        # Only the width is bounded; the height follows the aspect ratio.
+        image.thumbnail((width, sys.maxsize), Image.Resampling.LANCZOS)
+        out = BytesIO()
+        image.save(out, _THUMBNAIL_FORMAT, quality=_THUMBNAIL_QUALITY)
+        return out.getvalue()
+
+
+class ThumbnailStore:
+    """Content-addressed store of pre-sized album art.
+
+    Each source image is decoded once, downscaled to every configured width
+    and saved as WebP under the SHA-256 of the original bytes, so the same
+    artwork reached through different URLs is stored once. A small per-URL
+    reference file maps an image URL to its content hash.
+    """
+
+    def __init__(self, root: str, widths: tuple[int, ...]):
+        self.root = root
+        self.widths = tuple(sorted(set(widths)))
+        self._images_dir = os.path.join(root, 'images')
+        self._refs_dir = os.path.join(root, 'refs')
+        os.makedirs(self._images_dir, exist_ok=True)
+        os.makedirs(self._refs_dir, exist_ok=True)
+
+    def _ref_path(self, url: str) -> str:
+        return os.path.join(
+            self._refs_dir, hashlib.sha256(url.encode()).hexdigest()
+        )
+
+    def _image_path(self, digest: str, width: int) -> str:
+        return os.path.join(
+            self._images_dir, f'{digest}-{width}.{_THUMBNAIL_FORMAT.lower()}'
+        )
+
+    def get(self, url: str, width: int) -> bytes | None:
+        """Return the stored thumbnail for ``url``, or None if not ingested."""
+        if width not in self.widths:
+            raise ValueError(f'No thumbnails are kept at width {width}')
+        try:
+            with open(self._ref_path(url)) as f:
+                digest = f.read().strip()
+            with open(self._image_path(digest, width), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def ingest(self, url: str, image_bytes: bytes) -> None:
+        """Resize ``image_bytes`` to every configured width and store them.
+
+        Raises whatever Pillow raises if the bytes aren't a readable image.
+        """
+        digest = hashlib.sha256(image_bytes).hexdigest()
+        for width in self.widths:
+            path = self._image_path(digest, width)
+            if not os.path.exists(path):
+                _write_atomic(path, _resize(image_bytes, width))
+        _write_atomic(self._ref_path(url), digest.encode())
+
+
+class ResponseArchive:
+    """Raw API responses and image bytes recorded for offline replay.
+
+    Unlike the caches above, nothing here expires or is resized: a replay
+    sees exactly what was recorded. Entries are files named by the SHA-256
+    of their key, JSON under ``json/`` and image bytes under ``bytes/``.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        for kind in ('json', 'bytes'):
+            os.makedirs(os.path.join(root, kind), exist_ok=True)
+
+    def _path(self, kind: str, key: str) -> str:
+        return os.path.join(
+            self.root, kind, hashlib.sha256(key.encode()).hexdigest()
+        )
+
+    def get_json(self, key: str) -> Any:
+        try:
+            with open(self._path('json', key)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def put_json(self, key: str, payload: Any) -> None:
+        _write_atomic(self._path('json', key), json.dumps(payload).encode())
+
+    def get_bytes(self, key: str) -> bytes | None:
+        try:
+            with open(self._path('bytes', key), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put_bytes(self, key: str, content: bytes) -> None:
+        _write_atomic(self._path('bytes', key), content)
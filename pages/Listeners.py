@@ -1,28 +1,25 @@
 import streamlit as st
 
+import data
+import debug_panel
 import last_fm
+import timing
 
 
 def _display_album(
-    artist: str, album: str, lf_client: last_fm.LastFmClient, width: int = 300
+    result: last_fm.AlbumFetch, width: int = last_fm.DETAIL_ART_WIDTH
 ):
-    try:
-        album_data = lf_client.get_album(artist, album)
-        st.image(
-            album_data.get_album_art(),
-            caption=f"{artist} - {album}",
-            width=width,
-        )
-    except Exception:
-        st.write(f"{artist} - {album}")
-
-
-def _display_scores_given(listener_requester_df, reviews_df, listener):
+    caption = f"{result.artist} - {result.album}"
+    if result.error is None and result.album_art is not None:
+        st.image(result.album_art, caption=caption, width=width)
+    else:
+        st.write(caption)
+
+
+def _display_scores_given(listener_requester_df, aggregates, listener):
     given_scores = listener_requester_df.loc[[listener]]
-    avg_score_given = reviews_df[reviews_df["listener"] == listener][
-        "score"
-    ].mean()
-    given_scores["Average"] = avg_score_given
+    listener_stats = aggregates.listeners.set_index("listener")
+    given_scores["Average"] = listener_stats.loc[listener, "mean"]
 
     valid_scores = given_scores.loc[listener].dropna()
     sorted_columns = valid_scores.argsort()[::-1]
@@ -36,18 +33,10 @@ def _display_scores_given(listener_requester_df, reviews_df, listener):
     st.dataframe(styled_given_scores, hide_index=True)
 
 
-def _display_scores_received(
-    listener_requester_df, albums_df, reviews_df, listener
-):
+def _display_scores_received(listener_requester_df, aggregates, listener):
     received_scores = listener_requester_df[[listener]].dropna().T
-    listener_albums = albums_df[albums_df["requester"] == listener][
-        "album"
-    ].unique()
-    avg_score_received = reviews_df[
-        reviews_df["album"].isin(listener_albums)
-        & (reviews_df["listener"] != listener)
-    ]["score"].mean()
-    received_scores["Average"] = avg_score_received
+    requester_stats = aggregates.requesters.set_index("requester")
+    received_scores["Average"] = requester_stats["avg_received"].get(listener)
 
     sorted_received_scores = received_scores[
         received_scores.columns[received_scores.loc[listener].argsort()[::-1]]
@@ -73,15 +62,16 @@ def _display_deviation(deviation_df, listener):
     )
 
 
+@timing.timed('listeners.details')
 def _display_listener_details(
     listener,
     listener_requester_df,
     deviation_df,
-    reviews_df,
-    albums_df,
+    partitions,
+    aggregates,
     lf_client,
 ):
-    listener_reviews = reviews_df[reviews_df["listener"] == listener]
+    listener_reviews = partitions.reviews_by_listener(listener)
 
     if listener_reviews.empty:
         st.write("No reviews available for this listener.")
@@ -92,20 +82,24 @@ def _display_listener_details(
         listener_reviews["score"].idxmin()
     ]
 
+    # Look both albums up at once rather than one after the other.
+    fetches = lf_client.fetch_albums(
+        [
+            (favorite_album['artist'], favorite_album['album']),
+            (least_favorite_album['artist'], least_favorite_album['album']),
+        ],
+        art_width=last_fm.DETAIL_ART_WIDTH,
+    )
+    favorite, least_favorite = sorted(fetches, key=lambda r: r.index)
+
     fav_col, least_col = st.columns(2)
     with fav_col:
         st.markdown("### Favorite Album")
-        _display_album(
-            favorite_album['artist'], favorite_album['album'], lf_client
-        )
+        _display_album(favorite)
 
     with least_col:
         st.markdown("### Least Favorite Album")
-        _display_album(
-            least_favorite_album['artist'],
-            least_favorite_album['album'],
-            lf_client,
-        )
+        _display_album(least_favorite)
 
     st.markdown("#### Deviation from Other Listeners")
     if listener in deviation_df.index:
@@ -115,36 +109,67 @@ def _display_listener_details(
 
     st.markdown("#### Scores Given to Albums")
     if listener in listener_requester_df.index:
-        _display_scores_given(listener_requester_df, reviews_df, listener)
+        _display_scores_given(listener_requester_df, aggregates, listener)
     else:
         st.write("No scores available for this listener.")
 
     st.markdown("#### Scores Received by Listeners")
     if listener in listener_requester_df.columns:
-        _display_scores_received(
-            listener_requester_df, albums_df, reviews_df, listener
-        )
+        _display_scores_received(listener_requester_df, aggregates, listener)
     else:
         st.write("No scores available for this listener.")
 
 
-if "reviews_df" in st.session_state and "albums_df" in st.session_state:
-    reviews_df = st.session_state["reviews_df"]
-    albums_df = st.session_state["albums_df"]
-    deviation_df = st.session_state["deviation_df"]
-    listener_requester_df = st.session_state["listener_requester_df"]
-    lf_client = last_fm.LastFmClient(st.secrets['LAST_FM_API_KEY'])
-    listeners = reviews_df["listener"].drop_duplicates().tolist()
-    tabs = st.tabs(listeners)
-    for listener, tab in zip(listeners, tabs):
-        with tab:
-            _display_listener_details(
-                listener,
-                listener_requester_df,
-                deviation_df,
-                reviews_df,
-                albums_df,
-                lf_client,
-            )
+@st.fragment
+def _display_selected_listener(
+    listeners,
+    listener_requester_df,
+    deviation_df,
+    partitions,
+    aggregates,
+    lf_client,
+):
+    # Only the selected listener is computed and fetched; switching
+    # listeners reruns just this fragment, not the whole page.
+    listener = st.segmented_control(
+        "Listener",
+        listeners,
+        default=listeners[0],
+        key="selected_listener",
+        label_visibility="collapsed",
+    )
+    if listener is None:
+        st.info("Pick a listener to see their details.")
+        return
+    _display_listener_details(
+        listener,
+        listener_requester_df,
+        deviation_df,
+        partitions,
+        aggregates,
+        lf_client,
+    )
+
+
+data.ensure_session_state(st.secrets["SHEETS_DOC_ID"])
+
+dataset = st.session_state["dataset"]
+reviews_df = st.session_state["reviews_df"]
+aggregates = dataset.aggregates
+deviation_df = st.session_state["deviation_df"]
+listener_requester_df = st.session_state["listener_requester_df"]
+lf_client = last_fm.get_client(st.secrets['LAST_FM_API_KEY'])
+listeners = reviews_df["listener"].drop_duplicates().tolist()
+if listeners:
+    _display_selected_listener(
+        listeners,
+        listener_requester_df,
+        deviation_df,
+        dataset.partitions,
+        aggregates,
+        lf_client,
+    )
 else:
-    st.error("No reviews data available. Please visit the main page first.")
+    st.write("No reviews available yet.")
+
+debug_panel.render()
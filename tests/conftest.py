@@ -14,6 +14,32 @@ if ROOT not in sys.path:
     sys.path.insert(0, ROOT)
 
 
+@pytest.fixture(autouse=True)
+def isolated_cache_dir(tmp_path, monkeypatch):
+    """Point on-disk caches and snapshots at a per-test temp directory."""
+    cache_dir = tmp_path / "cache"
+    monkeypatch.setenv("RECORD_CLUB_CACHE_DIR", str(cache_dir))
+    return cache_dir
+
+
+@pytest.fixture(autouse=True)
+def no_background_refresh(monkeypatch):
+    """Keep the sheet refresher thread off unless a test starts one."""
+    monkeypatch.setenv("RECORD_CLUB_REFRESH_SECONDS", "0")
+
+
+@pytest.fixture(autouse=True)
+def clear_memory_caches():
+    """Keep Last.fm's module-level caches and circuit breaker from leaking
+    across tests."""
+    import last_fm
+
+    last_fm._metadata_cache.clear()
+    last_fm._art_cache.clear()
+    last_fm._failures.clear()
+    last_fm._breaker.reset()
+
+
 @pytest.fixture
 def raw_sheet_df() -> pd.DataFrame:
     """A DataFrame shaped like the Google Sheet ``load_sheet`` returns.
@@ -0,0 +1,41 @@
+import pandas as pd
+
+import data
+from benchmarks import bench_pipeline
+from benchmarks.synthetic_sheet import make_sheet, make_sheet_csv
+
+
+class TestMakeSheet:
+    def test_layout_matches_the_export(self):
+        df = make_sheet(n_listeners=3, n_albums=5)
+        assert list(df.columns[:6]) == [
+            " ", "Requester", "Artist", "Album", "Release Year", "Decade",
+        ]
+        assert list(df.columns[6:9]) == ["Listener 0", "Listener 0.1", "Listener 0.2"]
+        assert df.columns[-1] == "Average"
+        assert len(df) == 5
+
+    def test_listeners_are_detected(self):
+        df = data._normalize_columns(make_sheet(n_listeners=4, n_albums=10))
+        assert data.get_listeners(df) == [f"Listener {i}" for i in range(4)]
+
+    def test_is_deterministic_per_seed(self):
+        pd.testing.assert_frame_equal(make_sheet(seed=3), make_sheet(seed=3))
+        assert not make_sheet(seed=3).equals(make_sheet(seed=4))
+
+    def test_csv_round_trips_through_the_pipeline(self):
+        df = data.parse_sheet(make_sheet_csv(n_listeners=5, n_albums=40))
+        frames = data.build_frames(df)
+        reviews = frames["reviews_df"]
+        assert not reviews.empty
+        assert reviews["score"].between(0, 10).all()
+        assert set(frames["deviation_df"].columns) <= set(data.get_listeners(df))
+
+
+class TestBenchPipeline:
+    def test_reports_every_stage(self):
+        rows = bench_pipeline.run(n_listeners=3, n_albums=12, repeat=1)
+        assert [row["stage"] for row in rows] == [
+            name for name, _ in bench_pipeline.STAGES
+        ]
+        assert all(row["seconds"] >= 0 and row["peak_bytes"] >= 0 for row in rows)
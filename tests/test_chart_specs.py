@@ -0,0 +1,67 @@
+import copy
+
+import pyarrow as pa
+import pytest
+
+import chart_specs
+import data
+
+
+@pytest.fixture
+def dataset(raw_sheet_df):
+    frames = data.build_frames(data._normalize_columns(raw_sheet_df))
+    return data.Dataset("v1", frames)
+
+
+class TestStatsCharts:
+    def test_every_chart_validates(self, dataset):
+        charts = chart_specs.stats_charts(
+            dataset.charts, dataset.aggregates.decades
+        )
+        assert set(charts) == {
+            "score_histogram", "listener_histogram", "decade_albums",
+            "decade_scores", "release_years", "timeline",
+        }
+        for chart in charts.values():
+            chart.to_dict()
+
+    def test_empty_sections_are_left_out(self, dataset):
+        charts = dataset.charts._replace(
+            release_years=dataset.charts.release_years.iloc[:0],
+            timeline=dataset.charts.timeline.iloc[:0],
+        )
+        specs = chart_specs.build_stats_specs(
+            charts, dataset.aggregates.decades.iloc[:0]
+        )
+        assert set(specs) == {"score_histogram", "listener_histogram"}
+
+
+class TestSpecs:
+    def test_data_is_embedded_as_arrow(self, dataset):
+        spec = dataset.chart_specs["timeline"]
+        (name, content), = spec["datasets"].items()
+        assert spec["data"] == {"name": name}
+        table = pa.ipc.open_stream(content).read_all()
+        assert table.num_rows == len(dataset.charts.timeline)
+
+    def test_no_altair_theme_config(self, dataset):
+        assert "config" not in dataset.chart_specs["score_histogram"]
+
+    def test_built_once_per_dataset(self, dataset):
+        assert dataset.chart_specs is dataset.chart_specs
+
+    def test_rendering_leaves_cached_spec_untouched(self, dataset):
+        from streamlit.testing.v1 import AppTest
+
+        spec = dataset.chart_specs["score_histogram"]
+        before = copy.deepcopy(spec)
+
+        def page(spec):
+            import streamlit as st
+
+            st.vega_lite_chart(spec, use_container_width=True)
+            st.vega_lite_chart(spec, use_container_width=True)
+
+        at = AppTest.from_function(page, args=(spec,)).run()
+        assert not at.exception
+        assert spec == before
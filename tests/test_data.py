@@ -1,4 +1,9 @@
 """Tests for the pure data-munging helpers in ``data.py``."""
+import threading
+import time
+from io import BytesIO
+from unittest.mock import MagicMock, patch
+
 import numpy as np
 import pandas as pd
 import pytest
@@ -6,6 +11,18 @@ import pytest
 import data
 
 
+def _reviews(rows):
+    """Hand-written reviews with the integer keys the builders would add."""
+    reviews = pd.DataFrame(rows)
+    reviews.insert(0, "listener_id", pd.factorize(reviews["listener"])[0])
+    reviews.insert(
+        2,
+        "album_id",
+        pd.factorize(reviews["artist"] + "\x1f" + reviews["album"])[0],
+    )
+    return reviews
+
+
 class TestNormalizeColumns:
     def test_renames_whitespace_column_to_date(self):
         df = pd.DataFrame({" ": ["2024-01-01"], "Artist": ["Beatles"]})
@@ -54,6 +71,7 @@ class TestBuildAlbumsDf:
         df = data._normalize_columns(raw_sheet_df)
         albums = data.build_albums_df(df)
         assert set(albums.columns) == {
+            "album_id",
             "artist",
             "album",
             "requester",
@@ -124,7 +142,9 @@ class TestBuildReviewsDf:
         # 3 albums x 3 listeners = 9 reviews
         assert len(reviews) == 9
         assert set(reviews.columns) == {
+            "listener_id",
             "listener",
+            "album_id",
             "artist",
             "album",
             "score",
@@ -157,6 +177,26 @@ class TestBuildReviewsDf:
         ]
         assert alice_abbey.empty
 
+    def test_preserves_album_then_listener_order(self, raw_sheet_df):
+        df = data._normalize_columns(raw_sheet_df)
+        reviews = data.build_reviews_df(df, data.get_listeners(df))
+        assert reviews["listener"].tolist()[:3] == ["Alice", "Bob", "Carol"]
+        assert reviews["album"].tolist()[::3] == ["Abbey Road", "Let It Bleed", "IV"]
+
+    def test_missing_track_columns_become_null(self, raw_sheet_df):
+        df = data._normalize_columns(raw_sheet_df).drop(columns=["Carol.2"])
+        reviews = data.build_reviews_df(df, data.get_listeners(df))
+        carol = reviews[reviews["listener"] == "Carol"]
+        assert len(carol) == 3
+        assert carol["least_favorite_track"].isna().all()
+
+    def test_no_scores_returns_empty_frame_with_columns(self, raw_sheet_df):
+        df = data._normalize_columns(raw_sheet_df)
+        df[["Alice", "Bob", "Carol"]] = None
+        reviews = data.build_reviews_df(df, data.get_listeners(df))
+        assert reviews.empty
+        assert "score" in reviews.columns
+
 
 class TestBuildDeviationDf:
     def test_returns_square_matrix_plus_average_row(self, raw_sheet_df):
@@ -192,7 +232,7 @@ class TestBuildDeviationDf:
     def test_known_rmse_value(self):
         # Alice and Bob both rate two albums; Alice=[10, 6], Bob=[8, 8].
         # Differences: 2, -2. RMSE = sqrt((4+4)/2) = 2.0
-        reviews = pd.DataFrame(
+        reviews = _reviews(
             [
                 {"listener": "Alice", "artist": "X", "album": "A", "score": 10},
                 {"listener": "Alice", "artist": "X", "album": "B", "score": 6},
@@ -203,6 +243,71 @@ class TestBuildDeviationDf:
         deviation = data.build_deviation_df(reviews)
         assert deviation.loc["Alice", "Bob"] == pytest.approx(2.0)
 
+    def test_pairs_without_common_albums_are_zero(self):
+        reviews = _reviews(
+            [
+                {"listener": "Alice", "artist": "X", "album": "A", "score": 10},
+                {"listener": "Bob", "artist": "X", "album": "B", "score": 2},
+            ]
+        )
+        deviation = data.build_deviation_df(reviews)
+        assert deviation.loc["Alice", "Bob"] == 0
+
+    def test_same_album_title_by_different_artists_is_not_shared(self):
+        reviews = _reviews(
+            [
+                {"listener": "Alice", "artist": "X", "album": "A", "score": 10},
+                {"listener": "Bob", "artist": "Y", "album": "A", "score": 2},
+            ]
+        )
+        deviation = data.build_deviation_df(reviews)
+        assert deviation.loc["Alice", "Bob"] == 0
+
+    def test_mask_sparse_pairs_blanks_them_out_of_the_average(self):
+        reviews = _reviews(
+            [
+                {"listener": "Alice", "artist": "X", "album": "A", "score": 10},
+                {"listener": "Alice", "artist": "X", "album": "B", "score": 6},
+                {"listener": "Bob", "artist": "X", "album": "A", "score": 8},
+                {"listener": "Bob", "artist": "X", "album": "B", "score": 8},
+                {"listener": "Carol", "artist": "X", "album": "A", "score": 1},
+            ]
+        )
+        deviation, overlap = data.build_deviation_frames(reviews)
+        masked = data.mask_sparse_pairs(deviation, overlap, min_overlap=2)
+        assert masked.loc["Alice", "Bob"] == pytest.approx(2.0)
+        assert pd.isna(masked.loc["Alice", "Carol"])
+        # Carol shares too few albums with anyone (herself included).
+        assert pd.isna(masked.loc["average", "Carol"])
+        # Alice's own 0 and Bob's 2; Carol's column entry is left out.
+        assert masked.loc["average", "Alice"] == pytest.approx(1.0)
+        assert data.mask_sparse_pairs(deviation, overlap, 1) is deviation
+
+    def test_build_frames_makes_one_pass(self, raw_sheet_df):
+        df = data._normalize_columns(raw_sheet_df)
+        with patch.object(
+            data, "_pairwise_deviation", wraps=data._pairwise_deviation
+        ) as pairwise:
+            frames = data.build_frames(df)
+        assert pairwise.call_count == 1
+        pd.testing.assert_frame_equal(
+            frames["overlap_df"], data.build_overlap_df(frames["reviews_df"])
+        )
+
+
+class TestBuildOverlapDf:
+    def test_counts_albums_scored_by_both_listeners(self, raw_sheet_df):
+        df = data._normalize_columns(raw_sheet_df)
+        df.loc[0, "Alice"] = None
+        reviews = data.build_reviews_df(df, data.get_listeners(df))
+        overlap = data.build_overlap_df(reviews)
+
+        assert overlap.loc["Alice", "Bob"] == 2
+        assert overlap.loc["Bob", "Carol"] == 3
+        # Diagonal is each listener's own review count.
+        assert overlap.loc["Alice", "Alice"] == 2
+        assert (overlap.to_numpy() == overlap.to_numpy().T).all()
+
 
 class TestBuildListenerRequesterDf:
     def test_produces_pivot_keyed_by_listener_and_requester(self, raw_sheet_df):
@@ -219,7 +324,7 @@ class TestBuildListenerRequesterDf:
         assert set(pivot.columns) <= {"Alice", "Bob", "Carol"}
 
     def test_values_are_mean_scores_rounded_to_one_decimal(self):
-        reviews = pd.DataFrame(
+        reviews = _reviews(
             [
                 {"listener": "Alice", "artist": "X", "album": "A", "score": 9},
                 {"listener": "Alice", "artist": "X", "album": "B", "score": 6},
@@ -227,9 +332,667 @@ class TestBuildListenerRequesterDf:
         )
         albums = pd.DataFrame(
             [
-                {"artist": "X", "album": "A", "requester": "Bob"},
-                {"artist": "X", "album": "B", "requester": "Bob"},
+                {"album_id": 0, "artist": "X", "album": "A", "requester": "Bob"},
+                {"album_id": 1, "artist": "X", "album": "B", "requester": "Bob"},
             ]
         )
         pivot = data.build_listener_requester_df(reviews, albums)
         assert pivot.loc["Alice", "Bob"] == pytest.approx(7.5)
+
+    def test_float32_scores_are_averaged_in_float64(self):
+        # 6.35 exactly, which rounds to 6.4; summed in float32 it is just
+        # under and shows as 6.3.
+        scores = [6.5] * 7 + [6.0] * 3
+        reviews = _reviews(
+            [
+                {"listener": "Alice", "artist": "X", "album": str(i), "score": s}
+                for i, s in enumerate(scores)
+            ]
+        ).astype({"score": "float32"})
+        albums = pd.DataFrame(
+            {
+                "album_id": range(10),
+                "artist": "X",
+                "album": [str(i) for i in range(10)],
+                "requester": "Bob",
+            }
+        )
+        pivot = data.build_listener_requester_df(reviews, albums)
+        assert pivot.loc["Alice", "Bob"] == 6.4
+
+
+def _sheet_response(content, status=200, headers=None):
+    response = MagicMock()
+    response.status_code = status
+    response.content = content
+    response.headers = headers or {}
+    return response
+
+
+class TestDownloadSheet:
+    @pytest.fixture(autouse=True)
+    def clear_previous_downloads(self):
+        data._last_downloads.clear()
+        yield
+        data._last_downloads.clear()
+
+    def test_fingerprint_depends_only_on_content(self):
+        with patch.object(
+            data.requests, "get", return_value=_sheet_response(b"a,b\n1,2\n")
+        ):
+            first = data.download_sheet("doc")
+            second = data.download_sheet("other-doc")
+        assert first.fingerprint == second.fingerprint
+        with patch.object(
+            data.requests, "get", return_value=_sheet_response(b"a,b\n1,3\n")
+        ):
+            assert data.download_sheet("doc").fingerprint != first.fingerprint
+
+    def test_sends_validators_and_reuses_content_on_304(self):
+        first = _sheet_response(
+            b"a\n1\n", headers={"ETag": '"v1"', "Last-Modified": "yesterday"}
+        )
+        with patch.object(data.requests, "get", return_value=first):
+            original = data.download_sheet("doc")
+        with patch.object(
+            data.requests, "get", return_value=_sheet_response(b"", status=304)
+        ) as get:
+            again = data.download_sheet("doc")
+
+        sent = get.call_args.kwargs["headers"]
+        assert sent == {"If-None-Match": '"v1"', "If-Modified-Since": "yesterday"}
+        assert again == original
+
+    def test_first_request_is_unconditional(self):
+        with patch.object(
+            data.requests, "get", return_value=_sheet_response(b"a\n1\n")
+        ) as get:
+            data.download_sheet("doc")
+        assert get.call_args.kwargs["headers"] == {}
+        assert get.call_args.kwargs["timeout"] == data._SHEET_TIMEOUT
+
+    def test_parse_sheet_normalizes_date_column(self, raw_sheet_df):
+        content = raw_sheet_df.to_csv(index=False).encode()
+        df = data.parse_sheet(content)
+        assert "Date" in df.columns
+        assert data.get_listeners(df) == ["Alice", "Bob", "Carol"]
+
+
+class TestParseSheet:
+    def _csv(self, df):
+        return df.to_csv(index=False).encode()
+
+    def test_stray_text_in_scores_becomes_nan(self, raw_sheet_df):
+        raw_sheet_df["Bob"] = raw_sheet_df["Bob"].astype(object)
+        raw_sheet_df.loc[1, "Bob"] = "TBD"
+        df = data.parse_sheet(self._csv(raw_sheet_df))
+        assert df["Bob"].dtype == float
+        assert df["Bob"].isna().tolist() == [False, True, False]
+        reviews = data.build_reviews_df(df, data.get_listeners(df))
+        assert len(reviews) == 8
+
+    def test_release_year_is_numeric(self, raw_sheet_df):
+        raw_sheet_df["Release Year"] = ["1969", "n/a", "1971"]
+        df = data.parse_sheet(self._csv(raw_sheet_df))
+        assert pd.api.types.is_numeric_dtype(df["Release Year"])
+        assert df["Release Year"].isna().tolist() == [False, True, False]
+
+    def test_unused_columns_are_dropped(self, raw_sheet_df):
+        raw_sheet_df.insert(9, "Unnamed: 9", None)
+        raw_sheet_df["Notes"] = "x"
+        df = data.parse_sheet(self._csv(raw_sheet_df))
+        assert "Notes" not in df.columns
+        assert not any(c.startswith("Unnamed") for c in df.columns)
+        assert data.get_listeners(df) == ["Alice", "Bob", "Carol"]
+
+    def test_duplicate_and_blank_headers_match_pandas(self, raw_sheet_df):
+        # The real export repeats each listener's name over all three of
+        # their columns and leaves spacer columns unnamed.
+        content = self._csv(raw_sheet_df)
+        header, rest = content.split(b"\n", 1)
+        header = header.replace(b"Alice.1", b"Alice").replace(b"Alice.2", b"Alice")
+        content = header + b"\n" + rest
+        df = data.parse_sheet(content)
+        expected = data._normalize_columns(pd.read_csv(BytesIO(content)))
+        assert list(df.columns) == list(expected.columns)
+        assert df["Alice.1"].tolist() == expected["Alice.1"].tolist()
+
+    def test_builds_the_same_frames_as_the_default_parser(self, raw_sheet_df):
+        content = self._csv(raw_sheet_df)
+        expected = data.build_frames(
+            data._normalize_columns(pd.read_csv(BytesIO(content)))
+        )
+        frames = data.build_frames(data.parse_sheet(content))
+        for name in data.FRAME_NAMES:
+            pd.testing.assert_frame_equal(frames[name], expected[name])
+
+    def test_falls_back_when_pyarrow_rejects_the_file(self, raw_sheet_df):
+        # A short row: pandas pads it with NaN, pyarrow refuses it.
+        content = self._csv(raw_sheet_df) + b"2024-04-01,Dan,Low,Low\n"
+        df = data.parse_sheet(content)
+        assert len(df) == 4
+        assert data.get_listeners(df) == ["Alice", "Bob", "Carol"]
+
+    def test_year_to_decade_is_vectorized(self):
+        decades = data._year_to_decade(pd.Series([1969, 2001.0, None, "x"]))
+        assert decades.tolist()[:2] == ["1960s", "2000s"]
+        assert decades.isna().tolist() == [False, False, True, True]
+
+
+def _sheet(raw_sheet_df):
+    content = raw_sheet_df.to_csv(index=False).encode()
+    return data.SheetDownload(content, data.hashlib.sha256(content).hexdigest())
+
+
+@pytest.fixture
+def empty_registry():
+    """No built datasets, no latest version and no refreshers running."""
+    with patch.object(data, "_datasets", {}), \
+            patch.object(data, "_latest_version", None), \
+            patch.object(data, "_refreshers", {}):
+        yield
+        for refresher in data._refreshers.values():
+            refresher.stop(timeout=5)
+
+
+@pytest.fixture
+def session_state():
+    state = {}
+    with patch.object(data.st, "session_state", state):
+        yield state
+
+
+@pytest.mark.usefixtures("empty_registry")
+class TestEnsureSessionState:
+    def test_builds_every_frame(self, session_state, raw_sheet_df):
+        with patch.object(data, "fetch_sheet", return_value=_sheet(raw_sheet_df)):
+            data.ensure_session_state("doc")
+        assert len(session_state["reviews_df"]) == 9
+        assert "album_stats_df" in session_state
+        assert session_state["dataset_version"]
+        assert session_state["dataset"].reviews_df is session_state["reviews_df"]
+
+    def test_reuses_frames_while_fingerprint_matches(
+        self, session_state, raw_sheet_df
+    ):
+        sheet = _sheet(raw_sheet_df)
+        with patch.object(data, "fetch_sheet", return_value=sheet):
+            data.ensure_session_state("doc")
+            reviews = session_state["reviews_df"]
+            with patch.object(data, "build_reviews_df") as build:
+                data.ensure_session_state("doc")
+        build.assert_not_called()
+        assert session_state["reviews_df"] is reviews
+
+    def test_sessions_share_one_dataset(self, session_state, raw_sheet_df):
+        sheet = _sheet(raw_sheet_df)
+        with patch.object(data, "fetch_sheet", return_value=sheet):
+            data.ensure_session_state("doc")
+            first = session_state["dataset"]
+            session_state.clear()
+            with patch.object(data, "build_frames") as build:
+                data.ensure_session_state("doc")
+        build.assert_not_called()
+        assert session_state["dataset"] is first
+        assert session_state["reviews_df"] is first.reviews_df
+
+    def test_fresh_process_starts_from_snapshot(self, session_state, raw_sheet_df):
+        sheet = _sheet(raw_sheet_df)
+        with patch.object(data, "fetch_sheet", return_value=sheet):
+            data.ensure_session_state("doc")
+        session_state.clear()
+        data._datasets.clear()
+        data._latest_version = None
+
+        with patch.object(data, "fetch_sheet") as fetch:
+            data.ensure_session_state("doc")
+        fetch.assert_not_called()
+        assert session_state["dataset_version"] == sheet.fingerprint
+        assert len(session_state["reviews_df"]) == 9
+
+    def test_new_session_does_not_wait_for_a_rebuild(
+        self, session_state, raw_sheet_df
+    ):
+        with patch.object(data, "fetch_sheet", return_value=_sheet(raw_sheet_df)):
+            data.ensure_session_state("doc")
+        current = session_state["dataset"]
+
+        raw_sheet_df.loc[0, "Alice"] = None
+        changed = _sheet(raw_sheet_df)
+        building, release = threading.Event(), threading.Event()
+        build_frames = data.build_frames
+
+        def slow_build(df):
+            building.set()
+            release.wait(5)
+            return build_frames(df)
+
+        with patch.object(data, "build_frames", side_effect=slow_build):
+            rebuild = threading.Thread(target=data.get_dataset, args=(changed,))
+            rebuild.start()
+            try:
+                assert building.wait(5)
+                session_state.clear()
+                data.ensure_session_state("doc")
+                assert session_state["dataset"] is current
+            finally:
+                release.set()
+                rebuild.join(5)
+        assert data.latest_dataset().version == changed.fingerprint
+
+    def test_rebuilds_when_sheet_changes(self, session_state, raw_sheet_df):
+        with patch.object(data, "fetch_sheet", return_value=_sheet(raw_sheet_df)):
+            data.ensure_session_state("doc")
+        raw_sheet_df.loc[0, "Alice"] = None
+        with patch.object(data, "fetch_sheet", return_value=_sheet(raw_sheet_df)):
+            data.ensure_session_state("doc")
+        assert len(session_state["reviews_df"]) == 8
+
+
+@pytest.mark.usefixtures("empty_registry")
+class TestSheetRefresher:
+    def test_builds_and_registers_a_changed_sheet(self, raw_sheet_df):
+        sheet = _sheet(raw_sheet_df)
+        refresher = data.SheetRefresher("doc", 60)
+        with patch.object(data, "download_sheet", return_value=sheet):
+            dataset = refresher.refresh()
+        assert dataset.version == sheet.fingerprint
+        assert data.latest_dataset() is dataset
+        # Derived tables are built before sessions can see the dataset.
+        assert "chart_specs" in vars(dataset)
+
+    def test_shares_one_build_with_a_concurrent_session(self, raw_sheet_df):
+        sheet = _sheet(raw_sheet_df)
+        build_frames = data.build_frames
+        started = threading.Event()
+
+        def slow_build(df):
+            started.set()
+            time.sleep(0.2)
+            return build_frames(df)
+
+        refresher = data.SheetRefresher("doc", 60)
+        with patch.object(data, "download_sheet", return_value=sheet), \
+                patch.object(data, "build_frames", side_effect=slow_build) as build:
+            session = threading.Thread(target=data.get_dataset, args=(sheet,))
+            session.start()
+            assert started.wait(5)
+            dataset = refresher.refresh()
+            session.join(5)
+        assert build.call_count == 1
+        assert data.get_dataset(sheet) is dataset
+        assert data.load_snapshot(data.snapshot_dir())[0] == sheet.fingerprint
+
+    def test_unchanged_sheet_is_not_rebuilt(self, raw_sheet_df):
+        sheet = _sheet(raw_sheet_df)
+        refresher = data.SheetRefresher("doc", 60)
+        with patch.object(data, "download_sheet", return_value=sheet):
+            first = refresher.refresh()
+            with patch.object(data, "build_frames") as build:
+                assert refresher.refresh() is None
+        build.assert_not_called()
+        assert data.latest_dataset() is first
+
+    def test_failed_check_keeps_current_dataset(self, raw_sheet_df):
+        sheet = _sheet(raw_sheet_df)
+        with patch.object(data, "download_sheet", return_value=sheet):
+            data.SheetRefresher("doc", 60).refresh()
+        current = data.latest_dataset()
+
+        refresher = data.SheetRefresher("doc", 60)
+        error = data.requests.ConnectionError("offline")
+        with patch.object(data, "download_sheet", side_effect=error):
+            refresher.start()
+            assert refresher.ready.wait(5)
+            refresher.stop(timeout=5)
+        assert refresher.last_error is error
+        assert data.latest_dataset() is current
+
+    def test_started_once_per_sheet(self, monkeypatch):
+        monkeypatch.setenv("RECORD_CLUB_REFRESH_SECONDS", "3600")
+        with patch.object(data.SheetRefresher, "start", lambda self: self):
+            first = data.start_refresher("doc")
+            assert data.start_refresher("doc") is first
+            assert data.start_refresher("other") is not first
+        assert len(data.refreshers()) == 2
+
+    def test_off_when_interval_is_zero(self):
+        assert data.start_refresher("doc") is None
+
+    def test_sessions_never_fetch_and_pick_up_new_versions(
+        self, session_state, raw_sheet_df, monkeypatch
+    ):
+        monkeypatch.setenv("RECORD_CLUB_REFRESH_SECONDS", "3600")
+        sheet = _sheet(raw_sheet_df)
+        with patch.object(data, "download_sheet", return_value=sheet), \
+                patch.object(data, "fetch_sheet") as fetch:
+            data.ensure_session_state("doc")
+            assert session_state["dataset_version"] == sheet.fingerprint
+
+            raw_sheet_df.loc[0, "Alice"] = None
+            changed = _sheet(raw_sheet_df)
+            with patch.object(data, "download_sheet", return_value=changed):
+                data._refreshers["doc"].refresh()
+            data.ensure_session_state("doc")
+        fetch.assert_not_called()
+        assert session_state["dataset_version"] == changed.fingerprint
+        assert len(session_state["reviews_df"]) == 8
+
+
+class TestSnapshot:
+    @pytest.fixture
+    def frames(self, raw_sheet_df):
+        return data.build_frames(data._normalize_columns(raw_sheet_df))
+
+    def test_round_trips_every_frame(self, frames, tmp_path):
+        data.save_snapshot(frames, "v1", str(tmp_path))
+        version, loaded = data.load_snapshot(str(tmp_path))
+        assert version == "v1"
+        for name in data.FRAME_NAMES:
+            pd.testing.assert_frame_equal(loaded[name], frames[name])
+
+    def test_missing_snapshot_returns_none(self, tmp_path):
+        assert data.load_snapshot(str(tmp_path / "nothing")) is None
+
+    def test_ignores_snapshot_from_other_schema(self, frames, tmp_path):
+        data.save_snapshot(frames, "v1", str(tmp_path))
+        with patch.object(data, "_SNAPSHOT_SCHEMA", data._SNAPSHOT_SCHEMA + 1):
+            assert data.load_snapshot(str(tmp_path)) is None
+
+    def test_concurrent_saves_leave_a_loadable_snapshot(self, frames, tmp_path):
+        threads = [
+            threading.Thread(
+                target=data.save_snapshot, args=(frames, f"v{i}", str(tmp_path))
+            )
+            for i in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+        assert data.load_snapshot(str(tmp_path)) is not None
+        assert len([p for p in tmp_path.iterdir() if p.is_dir()]) == 1
+
+    def test_new_snapshot_replaces_old(self, frames, tmp_path):
+        data.save_snapshot(frames, "v1", str(tmp_path))
+        data.save_snapshot(frames, "v2", str(tmp_path))
+        assert data.load_snapshot(str(tmp_path))[0] == "v2"
+        subdirs = [p for p in tmp_path.iterdir() if p.is_dir()]
+        assert len(subdirs) == 1
+
+
+@pytest.mark.usefixtures("empty_registry")
+class TestDatasetRegistry:
+    def _dataset(self, version):
+        return data.Dataset(version, {name: pd.DataFrame() for name in data.FRAME_NAMES})
+
+    def test_keeps_only_most_recent_versions(self):
+        for version in ("v1", "v2", "v3"):
+            data._register_dataset(self._dataset(version))
+        assert list(data._datasets) == ["v2", "v3"]
+        assert data.latest_dataset().version == "v3"
+
+    def test_latest_is_none_without_builds_or_snapshot(self):
+        assert data.latest_dataset() is None
+
+
+class TestBuildAggregates:
+    @pytest.fixture
+    def aggregates(self, raw_sheet_df):
+        frames = data.build_frames(data._normalize_columns(raw_sheet_df))
+        return data.build_aggregates(
+            frames["reviews_df"], frames["albums_df"], frames["album_stats_df"]
+        )
+
+    def test_albums_are_sorted_best_first(self, aggregates):
+        means = aggregates.albums["mean"].tolist()
+        assert means == sorted(means, reverse=True)
+
+    def test_listener_stats(self, aggregates):
+        bob = aggregates.listeners.set_index("listener").loc["Bob"]
+        # Bob: 7, 9, 10
+        assert bob["mean"] == pytest.approx(8.67)
+        assert bob["min"] == 7
+        assert bob["count"] == 3
+
+    def test_requester_stats_exclude_own_scores_from_received(self, aggregates):
+        alice = aggregates.requesters.set_index("requester").loc["Alice"]
+        assert alice["picks"] == 1
+        # Abbey Road: Bob 7, Carol 8 (Alice's own 9 excluded)
+        assert alice["avg_received"] == pytest.approx(7.5)
+        assert alice["avg_reception"] == pytest.approx(8.0)
+
+    def test_decades_are_chronological(self, aggregates):
+        assert aggregates.decades["decade"].tolist() == ["60s", "70s"]
+        assert aggregates.decades["albums"].tolist() == [2, 1]
+
+    def test_track_counts(self, aggregates):
+        top = aggregates.favorite_tracks.iloc[0]
+        assert top["count"] == 1
+        assert set(aggregates.favorite_tracks.columns) == {
+            "artist",
+            "album",
+            "favorite_track",
+            "count",
+        }
+
+    def test_empty_reviews_give_empty_tables(self):
+        reviews = pd.DataFrame(columns=["listener", "artist", "album", "score"])
+        albums = pd.DataFrame(columns=["artist", "album", "requester"])
+        aggregates = data.build_aggregates(reviews, albums, pd.DataFrame())
+        assert aggregates.listeners.empty
+        assert "avg_received" in aggregates.requesters.columns
+
+    def test_dataset_memoizes_aggregates(self, raw_sheet_df):
+        frames = data.build_frames(data._normalize_columns(raw_sheet_df))
+        dataset = data.Dataset("v1", frames)
+        assert dataset.aggregates is dataset.aggregates
+
+
+class TestCompactDtypes:
+    @pytest.fixture
+    def frames(self, raw_sheet_df):
+        return data.build_frames(data._normalize_columns(raw_sheet_df))
+
+    def test_reviews_use_categories_and_float32_scores(self, frames):
+        reviews = frames["reviews_df"]
+        for col in ("listener", "artist", "album", "favorite_track"):
+            assert isinstance(reviews[col].dtype, pd.CategoricalDtype)
+        assert reviews["score"].dtype == np.float32
+
+    def test_categories_are_shared_across_frames(self, frames):
+        reviews, albums, stats = (
+            frames["reviews_df"],
+            frames["albums_df"],
+            frames["album_stats_df"],
+        )
+        for col in ("artist", "album"):
+            assert reviews[col].dtype == albums[col].dtype == stats[col].dtype
+        # Listeners and requesters are the same people.
+        assert reviews["listener"].dtype == albums["requester"].dtype
+
+    def test_stats_are_plain_floats(self, frames):
+        stats = frames["album_stats_df"]
+        assert stats["mean"].dtype == np.float64
+        assert stats["count"].tolist() == [3, 3, 3]
+
+    def test_pivot_labels_are_plain_strings(self, frames):
+        pivot = frames["listener_requester_df"]
+        assert not isinstance(pivot.index, pd.CategoricalIndex)
+        assert not isinstance(pivot.columns, pd.CategoricalIndex)
+
+    def test_memory_report_compares_object_and_compact_layouts(self, frames):
+        report = data.memory_report(frames).set_index("frame")
+        assert set(report.index) == set(data.FRAME_NAMES)
+        reviews = report.loc["reviews_df"]
+        assert reviews["after_bytes"] < reviews["before_bytes"]
+
+
+class TestIntegerKeys:
+    def test_album_ids_follow_first_seen_sheet_order(self, raw_sheet_df):
+        df = data._normalize_columns(raw_sheet_df)
+        albums = data.build_albums_df(df)
+        assert albums["album_id"].tolist() == [0, 1, 2]
+
+    def test_repeated_album_rows_share_an_id(self, raw_sheet_df):
+        df = data._normalize_columns(raw_sheet_df)
+        df = pd.concat([df, df.iloc[[0]]], ignore_index=True)
+        assert data.build_albums_df(df)["album_id"].tolist() == [0, 1, 2, 0]
+
+    def test_rows_missing_artist_get_sentinel_id(self, raw_sheet_df):
+        df = data._normalize_columns(raw_sheet_df)
+        df.loc[1, "Artist"] = None
+        assert data.build_albums_df(df)["album_id"].tolist() == [0, -1, 1]
+
+    def test_reviews_carry_matching_ids(self, raw_sheet_df):
+        df = data._normalize_columns(raw_sheet_df)
+        reviews = data.build_reviews_df(df, data.get_listeners(df))
+        albums = data.build_albums_df(df)
+        lookup = data.build_album_lookup(albums)
+        named = reviews.join(lookup[["album"]], on="album_id", rsuffix="_lookup")
+        assert (named["album"].astype(str) == named["album_lookup"].astype(str)).all()
+        listeners = data.build_listener_lookup(reviews)
+        assert listeners.to_dict() == {0: "Alice", 1: "Bob", 2: "Carol"}
+
+    def test_same_title_by_different_artists_stays_separate(self, raw_sheet_df):
+        df = data._normalize_columns(raw_sheet_df)
+        df.loc[1, "Album"] = "IV"
+        frames = data.build_frames(df)
+        stats = frames["album_stats_df"]
+        assert len(stats[stats["album"] == "IV"]) == 2
+        assert stats["album_id"].is_unique
+
+
+class TestPartitionIndex:
+    @pytest.fixture
+    def dataset(self, raw_sheet_df):
+        frames = data.build_frames(data._normalize_columns(raw_sheet_df))
+        return data.Dataset("v1", frames)
+
+    def test_listener_partition_matches_boolean_filter(self, dataset):
+        reviews = dataset.reviews_df
+        expected = reviews[reviews["listener"] == "Bob"]
+        pd.testing.assert_frame_equal(
+            dataset.partitions.reviews_by_listener("Bob"), expected
+        )
+
+    def test_unknown_listener_gives_empty_frame(self, dataset):
+        partitions = dataset.partitions
+        empty = partitions.reviews_by_listener("Nobody")
+        assert empty.empty
+        assert list(empty.columns) == list(dataset.reviews_df.columns)
+
+    def test_built_once_per_dataset(self, dataset):
+        assert dataset.partitions is dataset.partitions
+
+    def test_empty_reviews(self):
+        frames = {name: pd.DataFrame() for name in data.FRAME_NAMES}
+        partitions = data.Dataset("v1", frames).partitions
+        assert partitions.listener_rows == {}
+        assert partitions.reviews_by_listener("Alice").empty
+
+
+class TestStatsBundle:
+    @pytest.fixture
+    def dataset(self, raw_sheet_df):
+        frames = data.build_frames(data._normalize_columns(raw_sheet_df))
+        return data.Dataset("v1", frames)
+
+    def test_summary(self, dataset):
+        summary = dataset.stats.summary
+        assert summary["albums"] == 3
+        assert summary["reviews"] == 9
+        assert summary["listeners"] == 3
+        assert summary["perfect_tens"] == 1
+        assert summary["mean"] == pytest.approx(74 / 9)
+
+    def test_leaderboards_match_full_sorts(self, dataset):
+        stats = dataset.stats
+        album_stats = dataset.album_stats_df
+        assert stats.top_albums["album"].tolist() == (
+            album_stats.sort_values("mean", ascending=False)["album"].tolist()
+        )
+        assert stats.bottom_album["mean"] == 8.0
+        assert stats.top_album["album"] == "IV"
+        assert stats.divisive_albums.iloc[0]["album"] == "IV"
+        assert "requester" in stats.top_albums.columns
+
+    def test_unanimous_breaks_spread_ties_by_mean(self, dataset):
+        # Abbey Road (9, 7, 8) and Let It Bleed (8, 9, 7) share a spread.
+        unanimous = dataset.stats.unanimous_albums
+        assert unanimous["album"].tolist()[:2] == ["Abbey Road", "Let It Bleed"]
+
+    def test_listener_superlatives(self, dataset):
+        stats = dataset.stats
+        assert stats.harshest["listener"] == "Alice"
+        assert stats.kindest["listener"] == "Bob"
+        assert stats.most_volatile["listener"] == "Bob"
+        assert {"avg", "spread", "floor", "ceiling", "reviews"} <= set(
+            stats.listener_stats.columns
+        )
+
+    def test_hot_takes_are_furthest_from_club_average(self, dataset):
+        hot_takes = dataset.stats.hot_takes
+        assert hot_takes["delta"].abs().is_monotonic_decreasing
+        first = hot_takes.iloc[0]
+        # Alice gave IV a 7 against a club average of 8.67.
+        assert (first["listener"], first["album"]) == ("Alice", "IV")
+        assert list(hot_takes.columns) == [
+            "listener", "artist", "album", "score", "club_avg", "delta",
+        ]
+
+    def test_none_without_reviews(self, raw_sheet_df):
+        df = data._normalize_columns(raw_sheet_df)
+        listeners = ["Alice", "Bob", "Carol"]
+        df = df.drop(columns=[c for c in df.columns if c.startswith(tuple(listeners))])
+        assert data.Dataset("v1", data.build_frames(df)).stats is None
+
+
+class TestChartData:
+    @pytest.fixture
+    def dataset(self, raw_sheet_df):
+        frames = data.build_frames(data._normalize_columns(raw_sheet_df))
+        return data.Dataset("v1", frames)
+
+    def test_score_histogram_matches_numpy(self, dataset):
+        hist = dataset.charts.score_histogram
+        assert hist["reviews"].sum() == len(dataset.reviews_df)
+        assert (hist["bin_end"] - hist["bin_start"] == 0.5).all()
+        # Scores 7..10: the 10 lands in its own [10, 10.5) bin.
+        assert hist["bin_start"].iloc[0] == 7
+        assert hist.set_index("bin_start")["reviews"].to_dict() == {
+            7.0: 3, 7.5: 0, 8.0: 2, 8.5: 0, 9.0: 3, 9.5: 0, 10.0: 1,
+        }
+
+    def test_listener_histogram_sums_to_overall(self, dataset):
+        by_listener = dataset.charts.listener_histogram
+        overall = dataset.charts.score_histogram
+        assert (by_listener["reviews"] > 0).all()
+        totals = by_listener.groupby("bin_start")["reviews"].sum()
+        nonzero = overall[overall["reviews"] > 0].set_index("bin_start")["reviews"]
+        pd.testing.assert_series_equal(totals, nonzero, check_names=False)
+        bob = by_listener[by_listener["listener"] == "Bob"]
+        assert bob["bin_start"].tolist() == [7.0, 9.0, 10.0]
+
+    def test_release_year_trend_and_correlation(self, dataset):
+        charts = dataset.charts
+        assert list(charts.release_years.columns) == [
+            "artist", "album", "release_year", "mean",
+        ]
+        assert charts.release_year_trend["release_year"].tolist() == [1969, 1971]
+        expected = np.corrcoef(
+            charts.release_years["release_year"], charts.release_years["mean"]
+        )[0, 1]
+        assert charts.release_year_corr == pytest.approx(expected)
+
+    def test_timeline_is_cumulative_in_date_order(self, dataset):
+        timeline = dataset.charts.timeline
+        assert list(timeline.columns) == [
+            "date", "cumulative", "artist", "album", "mean",
+        ]
+        assert timeline["cumulative"].tolist() == [1, 2, 3]
+        assert timeline["date"].is_monotonic_increasing
+
+    def test_none_without_reviews(self):
+        frames = {name: pd.DataFrame() for name in data.FRAME_NAMES}
+        assert data.Dataset("v1", frames).charts is None
@@ -1,10 +1,13 @@
 """Tests for the Last.fm API client and ``Album`` response parser."""
+from io import BytesIO
 from unittest.mock import patch, MagicMock
 from urllib.parse import parse_qs, urlparse
 
 import pytest
+from PIL import Image
 
 import last_fm
+import last_fm_cache
 
 
 @pytest.fixture
@@ -54,9 +57,17 @@ class TestAlbum:
         assert album.listeners == "1234567"
         assert album.playcount == "98765432"
 
-    def test_picks_large_image(self, album_response):
+    def test_picks_extralarge_image(self, album_response):
+        album = last_fm.Album(album_response)
+        assert album.image_url == "https://img/xl.png"
+
+    def test_falls_back_to_large_image(self, album_response):
+        images = album_response["album"]["image"]
+        images[-1]["#text"] = ""
         album = last_fm.Album(album_response)
         assert album.image_url == "https://img/large.png"
+        album_response["album"]["image"] = images[:-1]
+        assert last_fm.Album(album_response).image_url == "https://img/large.png"
 
     def test_parses_tracks_with_rank_and_duration(self, album_response):
         album = last_fm.Album(album_response)
@@ -135,7 +146,7 @@ class TestLastFmClient:
     def test_make_call_raises_for_status(self):
         mock_response = MagicMock()
         mock_response.raise_for_status.side_effect = Exception("boom")
-        with patch.object(last_fm.requests, "get", return_value=mock_response):
+        with patch.object(last_fm.requests.Session, "get", return_value=mock_response):
             with pytest.raises(Exception, match="boom"):
                 last_fm._make_call("https://example.com")
 
@@ -143,13 +154,489 @@ class TestLastFmClient:
         mock_response = MagicMock()
         mock_response.json.return_value = {"ok": True}
         mock_response.raise_for_status.return_value = None
-        with patch.object(last_fm.requests, "get", return_value=mock_response):
+        with patch.object(last_fm.requests.Session, "get", return_value=mock_response):
             assert last_fm._make_call("https://example.com") == {"ok": True}
 
     def test_get_album_art_fetches_image_bytes(self, album_response):
         album = last_fm.Album(album_response)
         mock_response = MagicMock()
         mock_response.content = b"\x89PNG fake bytes"
-        with patch.object(last_fm.requests, "get", return_value=mock_response):
+        with patch.object(last_fm.requests.Session, "get", return_value=mock_response):
             buf = album.get_album_art()
         assert buf.read() == b"\x89PNG fake bytes"
+
+
+class TestFetchAlbums:
+    def test_yields_one_result_per_album_with_input_index(self, album_response):
+        client = last_fm.LastFmClient("k")
+        pairs = [("Radiohead", "OK Computer"), ("Radiohead", "Kid A")]
+        with patch.object(last_fm, "_make_call", return_value=album_response):
+            results = list(client.fetch_albums(pairs, with_art=False))
+
+        assert sorted(r.index for r in results) == [0, 1]
+        by_index = {r.index: r for r in results}
+        assert by_index[1].album == "Kid A"
+        assert all(r.error is None for r in results)
+        assert all(isinstance(r.album_data, last_fm.Album) for r in results)
+
+    def test_collects_errors_instead_of_raising(self, album_response):
+        client = last_fm.LastFmClient("k")
+
+        def fake_call(url, http=None):
+            if "Kid+A" in url:
+                raise RuntimeError("not found")
+            return album_response
+
+        pairs = [("Radiohead", "OK Computer"), ("Radiohead", "Kid A")]
+        with patch.object(last_fm, "_make_call", side_effect=fake_call):
+            results = {r.index: r for r in client.fetch_albums(pairs, with_art=False)}
+
+        assert results[0].error is None
+        assert isinstance(results[1].error, RuntimeError)
+        assert results[1].album_data is None
+
+    def test_missing_album_is_reported_as_error(self):
+        client = last_fm.LastFmClient("k")
+        with patch.object(last_fm, "_make_call", return_value=None):
+            (result,) = client.fetch_albums([("X", "Y")])
+        assert isinstance(result.error, LookupError)
+
+    def test_fetches_art_when_requested(self, album_response):
+        client = last_fm.LastFmClient("k")
+        with patch.object(last_fm, "_make_call", return_value=album_response), \
+                patch.object(last_fm, "_get_album_art", return_value="art") as art:
+            (result,) = client.fetch_albums([("Radiohead", "OK Computer")])
+        assert art.call_args[0][0] == "https://img/xl.png"
+        assert result.album_art == "art"
+
+    def test_empty_input_yields_nothing(self):
+        client = last_fm.LastFmClient("k")
+        assert list(client.fetch_albums([])) == []
+
+
+class TestMetadataStoreIntegration:
+    @pytest.fixture
+    def store(self, tmp_path):
+        store = last_fm_cache.MetadataStore(str(tmp_path / "meta.sqlite"))
+        yield store
+        store.close()
+
+    def test_serves_stored_album_without_calling_api(self, store, album_response):
+        store.put("Radiohead", "OK Computer", album_response)
+        client = last_fm.LastFmClient("k", metadata_store=store)
+        with patch.object(last_fm, "_make_call") as mk:
+            album = client.get_album("Radiohead", "OK Computer")
+        mk.assert_not_called()
+        assert album.title == "OK Computer"
+
+    def test_stores_fetched_album(self, store, album_response):
+        client = last_fm.LastFmClient("k", metadata_store=store)
+        with patch.object(last_fm, "_make_call", return_value=album_response):
+            client.get_album("Radiohead", "OK Computer")
+        assert store.get("Radiohead", "OK Computer")[0] == album_response
+
+    def test_does_not_store_error_responses(self, store):
+        client = last_fm.LastFmClient("k", metadata_store=store)
+        with patch.object(
+            last_fm, "_make_call", return_value={"error": 6, "message": "nope"}
+        ):
+            client.get_album("X", "Y")
+        assert store.get("X", "Y") is None
+
+    def test_stale_entry_is_served_and_refreshed_in_background(
+        self, tmp_path, album_response
+    ):
+        store = last_fm_cache.MetadataStore(str(tmp_path / "m.sqlite"), ttl=-1)
+        store.put("Radiohead", "OK Computer", {"album": {"name": "Old"}})
+        client = last_fm.LastFmClient("k", metadata_store=store)
+        with patch.object(
+            last_fm.HttpClient, "get_json", return_value=album_response
+        ):
+            album = client.get_album("Radiohead", "OK Computer")
+            client._refresher.shutdown(wait=True)
+
+        assert album.title == "Old"
+        assert store.get("Radiohead", "OK Computer")[0] == album_response
+        store.close()
+
+
+class TestThumbnails:
+    @pytest.fixture
+    def thumbs(self, tmp_path):
+        return last_fm_cache.ThumbnailStore(str(tmp_path / "art"), widths=(32,))
+
+    def _png(self):
+        buf = BytesIO()
+        Image.new("RGB", (174, 174)).save(buf, "PNG")
+        return buf.getvalue()
+
+    def test_page_widths_are_real_downscales(self, album_response, tmp_path):
+        thumbs = last_fm_cache.ThumbnailStore(
+            str(tmp_path / "page-art"),
+            widths=(last_fm.GRID_ART_WIDTH, last_fm.DETAIL_ART_WIDTH),
+        )
+        album = last_fm.Album(album_response, thumbs)
+        buf = BytesIO()
+        Image.new("RGB", (300, 300)).save(buf, "PNG")
+        with patch.object(
+            last_fm.HttpClient, "get_bytes", return_value=buf.getvalue()
+        ):
+            for width in thumbs.widths:
+                with Image.open(album.get_album_art(width)) as img:
+                    assert img.size == (width, width)
+
+    def test_get_album_art_returns_presized_thumbnail(self, album_response, thumbs):
+        album = last_fm.Album(album_response, thumbs)
+        with patch.object(
+            last_fm.HttpClient, "get_bytes", return_value=self._png()
+        ) as dl:
+            first = album.get_album_art(32).read()
+            second = album.get_album_art(32).read()
+        dl.assert_called_once_with("https://img/xl.png")
+        assert first == second
+        with Image.open(BytesIO(first)) as img:
+            assert img.size == (32, 32)
+
+    def test_unreadable_image_falls_back_to_original(self, album_response, thumbs):
+        album = last_fm.Album(album_response, thumbs)
+        with patch.object(last_fm.HttpClient, "get_bytes", return_value=b"junk"):
+            assert album.get_album_art(32).read() == b"junk"
+
+    def test_client_passes_store_to_albums(self, album_response, thumbs):
+        client = last_fm.LastFmClient("k", thumbnail_store=thumbs)
+        with patch.object(last_fm, "_make_call", return_value=album_response):
+            album = client.get_album("Radiohead", "OK Computer")
+        assert album._thumbnail_store is thumbs
+
+
+def _response(status=200, payload=None, headers=None, content=b""):
+    response = MagicMock()
+    response.status_code = status
+    response.headers = headers or {}
+    response.content = content
+    if status >= 400:
+        response.raise_for_status.side_effect = last_fm.requests.HTTPError(
+            response=response
+        )
+    if payload is None:
+        response.json.side_effect = ValueError("not json")
+    else:
+        response.json.return_value = payload
+    return response
+
+
+class TestHttpClient:
+    @pytest.fixture
+    def sleeps(self):
+        return []
+
+    @pytest.fixture
+    def http(self, sleeps):
+        return last_fm.HttpClient(max_retries=2, sleep=sleeps.append)
+
+    def test_uses_timeout_and_user_agent(self, http):
+        with patch.object(
+            http.session, "get", return_value=_response(payload={"ok": 1})
+        ) as get:
+            assert http.get_json("https://x") == {"ok": 1}
+        assert get.call_args.kwargs["timeout"] == last_fm._DEFAULT_TIMEOUT
+        assert http.session.headers["User-Agent"] == last_fm._USER_AGENT
+
+    def test_retries_rate_limit_honoring_retry_after(self, http, sleeps):
+        responses = [
+            _response(429, headers={"Retry-After": "2"}),
+            _response(payload={"ok": 1}),
+        ]
+        with patch.object(http.session, "get", side_effect=responses):
+            assert http.get_json("https://x") == {"ok": 1}
+        assert sleeps == [2.0]
+
+    def test_retries_last_fm_rate_limit_error_code(self, http, sleeps):
+        responses = [
+            _response(payload={"error": 29, "message": "Rate limit exceeded"}),
+            _response(payload={"album": {}}),
+        ]
+        with patch.object(http.session, "get", side_effect=responses):
+            assert http.get_json("https://x") == {"album": {}}
+        assert len(sleeps) == 1
+        assert 0 <= sleeps[0] <= last_fm._BACKOFF_BASE
+
+    def test_does_not_retry_permanent_api_errors(self, http, sleeps):
+        with patch.object(
+            http.session, "get", return_value=_response(payload={"error": 6})
+        ) as get:
+            with pytest.raises(last_fm.LastFmApiError) as raised:
+                http.get_json("https://x")
+        assert raised.value.code == 6
+        assert get.call_count == 1
+        assert sleeps == []
+
+    def test_raises_api_error_once_retries_run_out(self, http, sleeps):
+        offline = _response(payload={"error": 11, "message": "Service Offline"})
+        with patch.object(http.session, "get", return_value=offline) as get:
+            with pytest.raises(last_fm.LastFmApiError, match="Service Offline"):
+                http.get_json("https://x")
+        assert get.call_count == 3
+
+    def test_long_retry_after_is_not_slept_through(self, http, sleeps):
+        limited = _response(429, headers={"Retry-After": "60"})
+        with patch.object(http.session, "get", return_value=limited) as get:
+            assert http.get("https://x").status_code == 429
+        assert get.call_count == 1
+        assert sleeps == []
+
+    def test_gives_up_after_max_retries(self, http, sleeps):
+        with patch.object(
+            http.session, "get", side_effect=last_fm.requests.ConnectionError
+        ) as get:
+            with pytest.raises(last_fm.requests.ConnectionError):
+                http.get_bytes("https://x")
+        assert get.call_count == 3
+        assert len(sleeps) == 2
+
+    def test_returns_last_response_when_retries_exhausted(self, http):
+        with patch.object(http.session, "get", return_value=_response(503)):
+            response = http.get("https://x")
+        assert response.status_code == 503
+
+    def test_backoff_is_capped(self):
+        for attempt in range(20):
+            assert 0 <= last_fm._backoff_delay(attempt) <= last_fm._BACKOFF_CAP
+
+    def test_client_routes_album_and_art_through_its_session(self, album_response):
+        http = last_fm.HttpClient()
+        client = last_fm.LastFmClient("k", http=http)
+        responses = [
+            _response(payload=album_response),
+            _response(content=b"img"),
+        ]
+        with patch.object(http.session, "get", side_effect=responses) as get:
+            album = client.get_album("Session", "Routing")
+            assert album.get_album_art().read() == b"img"
+        assert get.call_count == 2
+
+
+class TestMemoryCaches:
+    def test_make_call_is_memoized_per_url(self):
+        http = MagicMock()
+        http.get_json.return_value = {"ok": True}
+        last_fm._make_call("https://a", http)
+        last_fm._make_call("https://a", http)
+        assert http.get_json.call_count == 1
+        assert last_fm.cache_stats()["metadata"]["hits"] == 1
+
+    def test_album_art_returns_fresh_buffer_each_time(self):
+        http = MagicMock()
+        http.get_bytes.return_value = b"img"
+        assert last_fm._get_album_art("https://img", http).read() == b"img"
+        assert last_fm._get_album_art("https://img", http).read() == b"img"
+        assert http.get_bytes.call_count == 1
+        assert last_fm.cache_stats()["art"]["bytes"] == 3
+
+
+class TestCircuitBreaker:
+    @pytest.fixture
+    def clock(self):
+        return [0.0]
+
+    @pytest.fixture
+    def breaker(self, clock):
+        return last_fm.CircuitBreaker(
+            threshold=2, reset_after=30, clock=lambda: clock[0]
+        )
+
+    def test_opens_after_consecutive_failures(self, breaker):
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == "open"
+        assert not breaker.allow()
+
+    def test_single_trial_after_reset_period(self, breaker, clock):
+        breaker.record_failure()
+        breaker.record_failure()
+        clock[0] = 30
+        assert breaker.allow()
+        assert not breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == "open"
+
+        clock[0] = 60
+        assert breaker.allow()
+        breaker.record_success()
+        assert breaker.state == "closed"
+        assert breaker.allow()
+
+
+class TestFailureHandling:
+    def test_failed_call_is_not_retried_within_ttl(self):
+        http = MagicMock()
+        http.get_json.side_effect = LookupError("Album not found")
+        with pytest.raises(LookupError):
+            last_fm._make_call("https://a", http)
+        with pytest.raises(last_fm.LastFmUnavailable, match="Album not found"):
+            last_fm._make_call("https://a", http)
+        assert http.get_json.call_count == 1
+        # Not an outage, so the circuit stays closed.
+        assert last_fm.health()["circuit"] == "closed"
+
+    def test_outages_open_the_circuit_for_every_url(self):
+        http = MagicMock()
+        http.get_json.side_effect = last_fm.requests.Timeout()
+        for i in range(last_fm._BREAKER_THRESHOLD):
+            with pytest.raises(last_fm.requests.Timeout):
+                last_fm._make_call(f"https://a/{i}", http)
+        with pytest.raises(last_fm.LastFmUnavailable):
+            last_fm._make_call("https://b", http)
+        assert http.get_json.call_count == last_fm._BREAKER_THRESHOLD
+        assert last_fm.health()["circuit"] == "open"
+
+    def test_not_found_errors_do_not_reset_the_outage_count(self):
+        http = MagicMock()
+
+        def get_json(url):
+            if url.endswith("missing"):
+                raise last_fm.LastFmApiError(6, "Album not found")
+            raise last_fm.requests.Timeout()
+
+        http.get_json.side_effect = get_json
+        for i in range(last_fm._BREAKER_THRESHOLD):
+            with pytest.raises(last_fm.LastFmApiError):
+                last_fm._make_call(f"https://a/{i}/missing", http)
+            with pytest.raises(last_fm.requests.Timeout):
+                last_fm._make_call(f"https://a/{i}", http)
+        assert last_fm.health()["circuit"] == "open"
+
+    def test_inconclusive_trial_neither_closes_nor_wedges(self):
+        now = [0.0]
+        breaker = last_fm.CircuitBreaker(
+            threshold=1, reset_after=30, clock=lambda: now[0]
+        )
+        breaker.record_failure()
+        now[0] = 30
+        assert breaker.allow()
+        breaker.record_inconclusive()
+        assert breaker.state != "closed"
+        # The next call gets to be the trial.
+        assert breaker.allow()
+        breaker.record_success()
+        assert breaker.state == "closed"
+
+    def test_what_counts_as_an_outage(self):
+        def http_error(status):
+            response = MagicMock(status_code=status)
+            return last_fm.requests.HTTPError(response=response)
+
+        assert last_fm._is_outage(http_error(503))
+        assert last_fm._is_outage(http_error(429))
+        assert not last_fm._is_outage(http_error(404))
+        assert not last_fm._is_outage(LookupError())
+        assert last_fm._is_outage(last_fm.LastFmApiError(29))
+        assert not last_fm._is_outage(last_fm.LastFmApiError(6))
+
+    def test_transient_api_errors_are_outages_not_results(self):
+        http = last_fm.HttpClient(max_retries=0)
+        offline = _response(payload={"error": 11, "message": "Service Offline"})
+        with patch.object(http.session, "get", return_value=offline) as get:
+            with pytest.raises(last_fm.LastFmApiError):
+                last_fm._make_call("https://a", http)
+            with pytest.raises(last_fm.LastFmUnavailable):
+                last_fm._make_call("https://a", http)
+        assert get.call_count == 1
+        assert len(last_fm._metadata_cache) == 0
+        assert last_fm.health()["recent_failures"] == 1
+        assert last_fm._breaker._failures == 1
+
+    def test_long_retry_after_holds_the_circuit_open(self):
+        now = [0.0]
+        breaker = last_fm.CircuitBreaker(clock=lambda: now[0])
+        http = last_fm.HttpClient(max_retries=0)
+        limited = _response(429, headers={"Retry-After": "120"})
+        with patch.object(last_fm, "_breaker", breaker), \
+                patch.object(http.session, "get", return_value=limited):
+            with pytest.raises(last_fm.requests.HTTPError):
+                last_fm._make_call("https://a", http)
+        assert breaker.state == "open"
+        now[0] = 119
+        assert not breaker.allow()
+        now[0] = 120
+        assert breaker.allow()
+
+    def test_fetch_albums_fails_fast_while_open(self, album_response):
+        http = MagicMock()
+        http.get_json.side_effect = last_fm.requests.ConnectionError()
+        client = last_fm.LastFmClient("k", http=http)
+        pairs = [("A", f"Album {i}") for i in range(10)]
+        results = list(client.fetch_albums(pairs, with_art=False, max_workers=1))
+        assert all(r.error is not None for r in results)
+        assert http.get_json.call_count == last_fm._BREAKER_THRESHOLD
+
+    def test_album_without_art_url_raises_without_a_request(self):
+        http = MagicMock()
+        album = last_fm.Album({"album": {"image": []}}, http=http)
+        with pytest.raises(LookupError):
+            album.get_album_art()
+        http.get_bytes.assert_not_called()
+
+
+class TestArchive:
+    @pytest.fixture
+    def archive(self, tmp_path):
+        return last_fm_cache.ResponseArchive(str(tmp_path / "archive"))
+
+    def _recorder(self, archive, album_response):
+        http = MagicMock()
+        http.get_json.return_value = album_response
+        http.get_bytes.return_value = b"art"
+        return last_fm.ArchiveHttpClient(archive, mode="record", http=http)
+
+    def test_replays_what_was_recorded(self, archive, album_response):
+        client = last_fm.LastFmClient(
+            "recording-key", http=self._recorder(archive, album_response)
+        )
+        (recorded,) = client.fetch_albums([("Radiohead", "OK Computer")])
+        last_fm._metadata_cache.clear()
+        last_fm._art_cache.clear()
+
+        replay = last_fm.ArchiveHttpClient(archive)
+        client = last_fm.LastFmClient("other-key", http=replay)
+        with patch.object(last_fm.requests.Session, "get") as network:
+            (replayed,) = client.fetch_albums([("Radiohead", "OK Computer")])
+        network.assert_not_called()
+        assert replayed.error is None
+        assert replayed.album_data.title == recorded.album_data.title
+        assert replayed.album_art.read() == b"art"
+
+    def test_archive_key_drops_api_key(self):
+        a = last_fm._archive_key("https://x/?b=2&api_key=one&a=1")
+        b = last_fm._archive_key("https://x/?a=1&api_key=two&b=2")
+        assert a == b == "https://x/?a=1&b=2"
+
+    def test_unrecorded_request_fails_in_replay(self, archive):
+        client = last_fm.LastFmClient("k", http=last_fm.ArchiveHttpClient(archive))
+        (result,) = client.fetch_albums([("X", "Y")])
+        assert isinstance(result.error, LookupError)
+
+    def test_replay_latency(self, archive, album_response):
+        archive.put_json("https://x/", album_response)
+        sleep = MagicMock()
+        http = last_fm.ArchiveHttpClient(archive, latency=0.25, sleep=sleep)
+        assert http.get_json("https://x/?api_key=k") == album_response
+        sleep.assert_called_once_with(0.25)
+
+    def test_rejects_unknown_mode(self, archive):
+        with pytest.raises(ValueError):
+            last_fm.ArchiveHttpClient(archive, mode="rewind")
+
+    def test_get_client_uses_archive_from_env(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("LAST_FM_ARCHIVE", "replay")
+        monkeypatch.setenv("LAST_FM_ARCHIVE_DIR", str(tmp_path / "archive"))
+        last_fm.get_client.clear()
+        try:
+            http = last_fm.get_client("k").http
+        finally:
+            last_fm.get_client.clear()
+        assert isinstance(http, last_fm.ArchiveHttpClient)
+        assert http.mode == "replay"
@@ -0,0 +1,189 @@
+"""Tests for the on-disk Last.fm caches in ``last_fm_cache.py``."""
+from io import BytesIO
+from unittest.mock import patch
+
+import pytest
+from PIL import Image
+
+import last_fm_cache
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = last_fm_cache.MetadataStore(str(tmp_path / "meta.sqlite"), ttl=60)
+    yield store
+    store.close()
+
+
+class TestNormalizeKey:
+    def test_ignores_case_and_extra_whitespace(self):
+        assert last_fm_cache.normalize_key(
+            "  Radiohead", "OK   computer "
+        ) == last_fm_cache.normalize_key("radiohead", "OK Computer")
+
+    def test_artist_and_album_are_not_concatenated_ambiguously(self):
+        assert last_fm_cache.normalize_key(
+            "A B", "C"
+        ) != last_fm_cache.normalize_key("A", "B C")
+
+
+class TestMetadataStore:
+    def test_miss_returns_none(self, store):
+        assert store.get("X", "Y") is None
+
+    def test_round_trips_payload_as_fresh(self, store):
+        store.put("Radiohead", "OK Computer", {"album": {"name": "OK Computer"}})
+        payload, stale = store.get("radiohead", "ok computer")
+        assert payload == {"album": {"name": "OK Computer"}}
+        assert stale is False
+        assert len(store) == 1
+
+    def test_entries_older_than_ttl_are_stale(self, store):
+        with patch.object(last_fm_cache.time, "time", return_value=1000.0):
+            store.put("X", "Y", {"album": {}})
+        with patch.object(last_fm_cache.time, "time", return_value=1061.0):
+            _, stale = store.get("X", "Y")
+        assert stale is True
+
+    def test_persists_across_instances(self, tmp_path):
+        path = str(tmp_path / "nested" / "meta.sqlite")
+        first = last_fm_cache.MetadataStore(path)
+        first.put("X", "Y", {"album": {"name": "Y"}})
+        first.close()
+
+        second = last_fm_cache.MetadataStore(path)
+        assert second.get("X", "Y")[0] == {"album": {"name": "Y"}}
+        second.close()
+
+
+def _png_bytes(width, height, mode="RGB"):
+    buf = BytesIO()
+    Image.new(mode, (width, height), color=0).save(buf, "PNG")
+    return buf.getvalue()
+
+
+class TestThumbnailStore:
+    @pytest.fixture
+    def thumbs(self, tmp_path):
+        return last_fm_cache.ThumbnailStore(str(tmp_path / "art"), widths=(50, 100))
+
+    def test_miss_returns_none(self, thumbs):
+        assert thumbs.get("https://img/a.png", 50) is None
+
+    def test_unconfigured_width_raises(self, thumbs):
+        with pytest.raises(ValueError):
+            thumbs.get("https://img/a.png", 75)
+
+    def test_ingest_downscales_to_each_width(self, thumbs):
+        thumbs.ingest("https://img/a.png", _png_bytes(300, 300))
+        for width in (50, 100):
+            with Image.open(BytesIO(thumbs.get("https://img/a.png", width))) as img:
+                assert img.format == "WEBP"
+                assert img.size == (width, width)
+
+    def test_only_the_width_is_bounded(self, thumbs):
+        thumbs.ingest("https://img/tall.png", _png_bytes(150, 300))
+        with Image.open(BytesIO(thumbs.get("https://img/tall.png", 100))) as img:
+            assert img.size == (100, 200)
+
+    def test_never_upscales(self, thumbs):
+        thumbs.ingest("https://img/small.png", _png_bytes(64, 64, mode="P"))
+        with Image.open(BytesIO(thumbs.get("https://img/small.png", 100))) as img:
+            assert img.size == (64, 64)
+
+    def test_identical_images_share_storage(self, thumbs, tmp_path):
+        image = _png_bytes(120, 120)
+        thumbs.ingest("https://img/a.png", image)
+        thumbs.ingest("https://mirror/a.png", image)
+        assert thumbs.get("https://mirror/a.png", 50) == thumbs.get(
+            "https://img/a.png", 50
+        )
+        assert len(list((tmp_path / "art" / "images").iterdir())) == 2
+
+    def test_rejects_non_images(self, thumbs):
+        with pytest.raises(Exception):
+            thumbs.ingest("https://img/bad.png", b"not an image")
+        assert thumbs.get("https://img/bad.png", 50) is None
+
+
+class TestByteLRU:
+    def test_tracks_hits_and_misses(self):
+        lru = last_fm_cache.ByteLRU(100, len)
+        assert lru.get("a") is None
+        lru.put("a", b"xx")
+        assert lru.get("a") == b"xx"
+        stats = lru.stats()
+        assert (stats["hits"], stats["misses"]) == (1, 1)
+        assert stats["bytes"] == 2
+
+    def test_evicts_least_recently_used_to_fit_budget(self):
+        lru = last_fm_cache.ByteLRU(10, len)
+        lru.put("a", b"aaaa")
+        lru.put("b", b"bbbb")
+        lru.get("a")
+        lru.put("c", b"cccc")
+        assert lru.get("b") is None
+        assert lru.get("a") == b"aaaa"
+        assert lru.stats()["evictions"] == 1
+        assert lru.stats()["bytes"] == 8
+
+    def test_replacing_a_key_updates_size(self):
+        lru = last_fm_cache.ByteLRU(10, len)
+        lru.put("a", b"aaaa")
+        lru.put("a", b"aa")
+        assert lru.stats()["bytes"] == 2
+        assert len(lru) == 1
+
+    def test_values_larger_than_budget_are_not_stored(self):
+        lru = last_fm_cache.ByteLRU(4, len)
+        assert lru.get_or_load("big", lambda: b"too big") == b"too big"
+        assert len(lru) == 0
+
+    def test_get_or_load_does_not_cache_exceptions(self):
+        lru = last_fm_cache.ByteLRU(100, len)
+
+        def boom():
+            raise RuntimeError("nope")
+
+        with pytest.raises(RuntimeError):
+            lru.get_or_load("k", boom)
+        assert lru.get_or_load("k", lambda: b"ok") == b"ok"
+
+    def test_json_size_counts_serialized_bytes(self):
+        assert last_fm_cache.json_size({"a": 1}) == len('{"a":1}')
+
+
+class TestFailureCache:
+    def test_remembers_failure_until_ttl(self):
+        now = [0.0]
+        failures = last_fm_cache.FailureCache(60, clock=lambda: now[0])
+        failures.put("a", LookupError("not found"))
+        now[0] = 59
+        assert failures.get("a") == "not found"
+        now[0] = 60
+        assert failures.get("a") is None
+        assert len(failures) == 0
+        assert failures.hits == 1
+
+    def test_drops_oldest_past_max_entries(self):
+        failures = last_fm_cache.FailureCache(60, max_entries=2)
+        for key in ("a", "b", "c"):
+            failures.put(key, RuntimeError(key))
+        assert failures.get("a") is None
+        assert failures.get("c") == "c"
+
+
+class TestResponseArchive:
+    @pytest.fixture
+    def archive(self, tmp_path):
+        return last_fm_cache.ResponseArchive(str(tmp_path / "archive"))
+
+    def test_round_trips_json_and_bytes(self, archive):
+        archive.put_json("k", {"album": {"name": "X"}})
+        archive.put_bytes("k", b"\x89PNG")
+        assert archive.get_json("k") == {"album": {"name": "X"}}
+        assert archive.get_bytes("k") == b"\x89PNG"
+
+    def test_missing_entries_are_none(self, archive):
+        assert archive.get_json("nope") is None
+        assert archive.get_bytes("nope") is None
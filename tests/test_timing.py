@@ -0,0 +1,100 @@
+import json
+import logging
+
+import pytest
+
+import timing
+
+
+@pytest.fixture
+def enabled():
+    previous = timing.enabled()
+    timing.set_enabled(True)
+    timing.reset()
+    yield
+    timing.set_enabled(previous)
+    timing.reset()
+
+
+class TestDisabled:
+    @pytest.fixture(autouse=True)
+    def disabled(self):
+        previous = timing.enabled()
+        timing.set_enabled(False)
+        timing.reset()
+        yield
+        timing.set_enabled(previous)
+
+    def test_nothing_is_recorded(self):
+        with timing.stage("a"):
+            pass
+        timing.timed("b")(lambda: None)()
+        timing.laps("c").mark("d")
+        assert timing.summary() == []
+
+    def test_stage_is_a_shared_no_op(self):
+        assert timing.stage("a") is timing.stage("b")
+
+
+class TestEnabled:
+    def test_stage_records_duration(self, enabled):
+        with timing.stage("parse"):
+            pass
+        (row,) = timing.summary()
+        assert row["stage"] == "parse"
+        assert row["runs"] == 1
+        assert row["p50_ms"] >= 0
+
+    def test_failed_stage_is_recorded_and_reraised(self, enabled, caplog):
+        with caplog.at_level(logging.INFO, logger="timing"):
+            with pytest.raises(ValueError):
+                with timing.stage("boom"):
+                    raise ValueError
+        assert json.loads(caplog.records[-1].getMessage())["ok"] is False
+        assert timing.summary()[0]["runs"] == 1
+
+    def test_timed_preserves_result_and_name(self, enabled):
+        @timing.timed("double")
+        def double(x):
+            return 2 * x
+
+        assert double(3) == 6
+        assert double.__name__ == "double"
+        assert timing.summary()[0]["stage"] == "double"
+
+    def test_laps_split_between_marks(self, enabled):
+        laps = timing.laps("page")
+        laps.mark("top")
+        laps.mark("bottom")
+        assert [row["stage"] for row in timing.summary()] == [
+            "page.bottom", "page.top",
+        ]
+
+    def test_percentiles_over_ring_buffer(self, enabled):
+        for ms in range(1, 101):
+            timing.record("s", ms / 1000)
+        row = timing.summary()[0]
+        assert row["p50_ms"] == pytest.approx(50.5)
+        assert row["p95_ms"] == pytest.approx(95.05)
+        assert row["last_ms"] == pytest.approx(100)
+
+    def test_ring_buffer_keeps_recent_samples(self, enabled):
+        for _ in range(timing.MAX_SAMPLES + 5):
+            timing.record("s", 0.001)
+        assert timing.summary()[0]["runs"] == timing.MAX_SAMPLES
+
+    def test_structured_log_line(self, enabled, caplog):
+        with caplog.at_level(logging.INFO, logger="timing"):
+            timing.record("fetch", 0.0125)
+        assert json.loads(caplog.records[-1].getMessage()) == {
+            "stage": "fetch", "ms": 12.5, "ok": True,
+        }
+
+
+class TestInstrumentation:
+    def test_build_frames_times_each_builder(self, enabled, raw_sheet_df):
+        import data
+
+        data.build_frames(data._normalize_columns(raw_sheet_df))
+        stages = {row["stage"] for row in timing.summary()}
+        assert {"build.reviews", "build.deviation", "build.album_stats"} <= stages
@@ -0,0 +1,90 @@
+"""Tests for the Last.fm cache warm-up command."""
+from io import BytesIO
+from unittest.mock import MagicMock
+
+import pandas as pd
+import pytest
+from PIL import Image
+
+import data
+import last_fm
+import last_fm_cache
+import warm_cache
+
+
+def _album_payload(artist, album):
+    return {
+        "album": {
+            "artist": artist,
+            "name": album,
+            "image": [{"#text": f"https://img/{album}.png", "size": "large"}],
+        }
+    }
+
+
+@pytest.fixture
+def client(tmp_path):
+    buf = BytesIO()
+    Image.new("RGB", (64, 64)).save(buf, "PNG")
+    http = MagicMock()
+    http.get_bytes.return_value = buf.getvalue()
+
+    def get_json(url):
+        if "Missing" in url:
+            return {"error": 6, "message": "Album not found"}
+        query = dict(p.split("=") for p in url.split("?")[1].split("&"))
+        return _album_payload(query["artist"], query["album"])
+
+    http.get_json.side_effect = get_json
+    store = last_fm_cache.MetadataStore(str(tmp_path / "meta.sqlite"))
+    thumbs = last_fm_cache.ThumbnailStore(str(tmp_path / "art"), widths=(16, 32))
+    yield last_fm.LastFmClient(
+        "k", metadata_store=store, thumbnail_store=thumbs, http=http
+    )
+    store.close()
+
+
+class TestAlbumOrder:
+    def test_best_scored_first_then_unreviewed(self, raw_sheet_df):
+        df = data._normalize_columns(raw_sheet_df)
+        df = pd.concat(
+            [df, pd.DataFrame({"Artist": ["New"], "Album": ["Unheard"]})],
+            ignore_index=True,
+        )
+        albums_df = data.build_albums_df(df)
+        stats = data.build_album_stats_df(
+            data.build_reviews_df(df, data.get_listeners(df)), albums_df
+        )
+        assert warm_cache.album_order(albums_df, stats) == [
+            ("Zeppelin", "IV"),
+            ("Beatles", "Abbey Road"),
+            ("Stones", "Let It Bleed"),
+            ("New", "Unheard"),
+        ]
+
+    def test_no_reviews_keeps_sheet_order(self, raw_sheet_df):
+        albums_df = data.build_albums_df(data._normalize_columns(raw_sheet_df))
+        order = warm_cache.album_order(albums_df, pd.DataFrame())
+        assert order[0] == ("Beatles", "Abbey Road")
+
+
+class TestWarm:
+    def test_cold_then_warm_counts(self, client):
+        albums = [("A", "One"), ("B", "Two")]
+        totals, failures = warm_cache.warm(client, albums, max_workers=2)
+        assert failures == []
+        assert totals["metadata_misses"] == 2
+        assert totals["art_misses"] == 2
+
+        totals, _ = warm_cache.warm(client, albums, max_workers=2)
+        assert totals["metadata_hits"] == 2
+        assert totals["art_hits"] == 2
+        assert client.http.get_json.call_count == 2
+
+    def test_failures_are_counted_not_raised(self, client):
+        totals, failures = warm_cache.warm(
+            client, [("A", "One"), ("X", "Missing")]
+        )
+        assert totals["failures"] == 1
+        assert failures[0][:2] == ("X", "Missing")
+        assert isinstance(failures[0][2], LookupError)
@@ -0,0 +1,158 @@
+"""Opt-in stage timings for data loading, Last.fm calls and page sections.
+
+Timing is off unless ``RECORD_CLUB_TIMING`` is set to something other than
+``0``. While off, ``stage``, ``timed`` and ``laps`` hand back shared no-op
+objects, so instrumented code pays about one attribute lookup per stage.
+
+While on, every finished stage is logged as one JSON object on the
+``timing`` logger and kept in a per-stage ring buffer of recent durations,
+which ``summary`` reduces to p50/p95 for the debug panel.
+"""
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Recent durations kept per stage for the percentiles.
+MAX_SAMPLES = 200
+
+_enabled = os.environ.get('RECORD_CLUB_TIMING', '0') not in ('', '0')
+_lock = threading.Lock()
+_samples: dict[str, deque] = {}
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def set_enabled(flag: bool) -> None:
+    global _enabled
+    _enabled = bool(flag)
+
+
+def record(name: str, seconds: float, ok: bool = True) -> None:
+    """Store one duration for ``name`` and log it."""
+    with _lock:
+        samples = _samples.get(name)
+        if samples is None:
+            samples = _samples[name] = deque(maxlen=MAX_SAMPLES)
+        samples.append(seconds)
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(
+            json.dumps(
+                {'stage': name, 'ms': round(seconds * 1000, 3), 'ok': ok}
+            )
+        )
+
+
+class _Stage:
+    __slots__ = ('name', '_start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        record(self.name, time.perf_counter() - self._start, exc_type is None)
+        return False
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+def stage(name: str):
+    """Context manager timing the enclosed block as ``name``."""
+    return _Stage(name) if _enabled else _NULL_STAGE
+
+
+def timed(name: str):
+    """Decorator timing every call of the wrapped function as ``name``."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Stage(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class _Laps:
+    __slots__ = ('prefix', '_last')
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self._last = time.perf_counter()
+
+    def mark(self, section: str) -> None:
+        now = time.perf_counter()
+        record(f'{self.prefix}.{section}', now - self._last)
+        self._last = now
+
+
+class _NullLaps:
+    __slots__ = ()
+
+    def mark(self, section: str) -> None:
+        pass
+
+
+_NULL_LAPS = _NullLaps()
+
+
+def laps(prefix: str):
+    """Split timer for straight-line scripts.
+
+    Each ``mark(section)`` records the time since the previous mark (or
+    since ``laps`` was called) as ``prefix.section``.
+    """
+    return _Laps(prefix) if _enabled else _NULL_LAPS
+
+
+def summary() -> list[dict]:
+    """Per-stage count, p50, p95 and latest duration in milliseconds."""
+    with _lock:
+        snapshot = {name: list(samples) for name, samples in _samples.items()}
+    rows = []
+    for name in sorted(snapshot):
+        ms = np.asarray(snapshot[name]) * 1000
+        p50, p95 = np.percentile(ms, [50, 95])
+        rows.append(
+            {
+                'stage': name,
+                'runs': len(ms),
+                'p50_ms': round(float(p50), 2),
+                'p95_ms': round(float(p95), 2),
+                'last_ms': round(float(ms[-1]), 2),
+            }
+        )
+    return rows
+
+
+def reset() -> None:
+    with _lock:
+        _samples.clear()
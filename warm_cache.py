@@ -0,0 +1,134 @@
+"""Pre-fetch every club album from Last.fm so the first visitor doesn't.
+
+Run from the repository root after a deploy::
+
+    python warm_cache.py
+    python warm_cache.py --workers 4 --limit 100
+
+The sheet id and API key come from ``SHEETS_DOC_ID`` / ``LAST_FM_API_KEY``
+in the environment, or from ``.streamlit/secrets.toml`` like the app. Albums
+are warmed best-scored first, then any that haven't been reviewed yet, so a
+warm-up cut short still covers the home page's Top Albums grid.
+"""
+import argparse
+import logging
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import streamlit as st
+
+import data
+import last_fm
+
+
+def album_order(
+    albums_df: pd.DataFrame, album_stats_df: pd.DataFrame
+) -> list[tuple[str, str]]:
+    """Every distinct (artist, album), highest mean score first."""
+    parts = [albums_df[['artist', 'album']]]
+    if not album_stats_df.empty:
+        ranked = album_stats_df.sort_values(
+            'mean', ascending=False, kind='stable'
+        )
+        parts.insert(0, ranked[['artist', 'album']])
+    ordered = pd.concat(parts).astype(object).dropna().drop_duplicates()
+    return list(ordered.itertuples(index=False, name=None))
+
+
+def _warm_one(
+    client: last_fm.LastFmClient, artist: str, album: str
+) -> Counter:
+    counts = Counter()
+    store = client.metadata_store
+    if store is not None and store.get(artist, album) is not None:
+        counts['metadata_hits'] += 1
+    else:
+        counts['metadata_misses'] += 1
+    album_data = client.get_album(artist, album)
+    if album_data is None or album_data.image_url is None:
+        raise LookupError(f'No Last.fm album art for {artist} - {album}')
+
+    thumbnails = client.thumbnail_store
+    if thumbnails is None:
+        counts['art_misses'] += 1
+        album_data.get_album_art()
+        return counts
+    url = album_data.image_url
+    if all(thumbnails.get(url, width) for width in thumbnails.widths):
+        counts['art_hits'] += 1
+    else:
+        counts['art_misses'] += 1
+        album_data.get_album_art(thumbnails.widths[0])
+    return counts
+
+
+def warm(
+    client: last_fm.LastFmClient,
+    albums: list[tuple[str, str]],
+    max_workers: int = last_fm._DEFAULT_MAX_WORKERS,
+) -> tuple[Counter, list[tuple[str, str, Exception]]]:
+    """Fetch metadata and art for ``albums`` in order.
+
+    At most ``max_workers`` albums are in flight at once. Returns the
+    hit/miss counts and the albums that failed, with their errors.
+    """
+    totals = Counter()
+    failures = []
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        futures = [
+            (artist, album, pool.submit(_warm_one, client, artist, album))
+            for artist, album in albums
+        ]
+        for artist, album, future in futures:
+            try:
+                totals.update(future.result())
+            except Exception as e:
+                failures.append((artist, album, e))
+    totals['failures'] = len(failures)
+    return totals, failures
+
+
+def _setting(name: str) -> str:
+    return os.environ.get(name) or st.secrets[name]
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument(
+        '--workers', type=int, default=last_fm._DEFAULT_MAX_WORKERS
+    )
+    parser.add_argument(
+        '--limit', type=int, help='only warm this many top albums'
+    )
+    parser.add_argument(
+        '-v', '--verbose', action='store_true', help='list failed albums'
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    df = data.load_sheet(_setting('SHEETS_DOC_ID'))
+    listeners = data.get_listeners(df)
+    albums_df = data.build_albums_df(df)
+    album_stats_df = data.build_album_stats_df(
+        data.build_reviews_df(df, listeners), albums_df
+    )
+    albums = album_order(albums_df, album_stats_df)[: args.limit]
+
+    client = last_fm.get_client(_setting('LAST_FM_API_KEY'))
+    totals, failures = warm(client, albums, args.workers)
+    print(
+        f"{len(albums)} albums: "
+        f"metadata {totals['metadata_hits']} hits / "
+        f"{totals['metadata_misses']} misses, "
+        f"art {totals['art_hits']} hits / {totals['art_misses']} misses, "
+        f"{totals['failures']} failures"
+    )
+    if args.verbose:
+        for artist, album, error in failures:
+            print(f'  {artist} - {album}: {error}')
+
+
+if __name__ == '__main__':
+    main()